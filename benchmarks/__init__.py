@@ -0,0 +1,6 @@
+"""Benchmarks for the Domain Assignment Checker
+
+svgen generates seeded synthetic pipeline code, run times the parse, rule
+compile and check stages on it against baseline.json. The bench_*
+scripts each stress one part of the checker.
+"""
@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+"""Batch engine benchmark
+
+Checks generated files, and any files given, with the line engine and
+the batch engines, with per file limits. The results must be the same,
+tests/test_engines.py checks the same on every test run.
+Then times the check stage of each engine in microseconds per line, as
+--stats reports it, at a low and a high violation rate, and with wide
+embedded rules over 1024 pipe stages. Checkers keep the compiled rules
+of files like the command line does.
+
+Usage: python -m benchmarks.bench_batch [FILE...]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+NUM_LINES = 10000
+RATES = [0.02, 0.3]
+LIMITS = [None, 1, 3, 50]
+BATCH_SIZES = [1, 7, 1024]
+RUNS = 10
+WIDE_RULES = (
+    "// DACrule: s1-1023, p1-1023, e1-1023 <= s0-1022, p0-1022, e0-1022\n"
+    "// DACrule: s0-1023, p0-1023, e0-1023 = s0-1023, p0-1023, e0-1023\n")
+
+
+def engines():
+    ''' The batch engines to compare, numpy if it is installed '''
+    if svdac.load_numpy() is None:
+        return ['batch']
+    return ['batch', 'numpy']
+
+
+def outcome(result):
+    return (svdac.result_to_dict(result),
+            [violation.linenum for violation in result.violations])
+
+
+def compare(texts):
+    ''' Number of (file, engine, limit, batch size) the engines differ on '''
+    differences = 0
+    for limit in LIMITS:
+        line = svdac.Checker(max_per_file=limit)
+        expected = {name: outcome(line.check_text(text, name))
+                    for name, text in texts}
+        for engine in engines():
+            for batch_size in BATCH_SIZES:
+                checker = svdac.Checker(engine=engine, max_per_file=limit,
+                                        batch_size=batch_size,
+                                        ruleset_cache=64)
+                for name, text in texts:
+                    if outcome(checker.check_text(text, name)) != \
+                            expected[name]:
+                        print(f"{name}: {engine} with limit {limit}, batch "
+                              f"size {batch_size} differs")
+                        differences += 1
+    return differences
+
+
+def check_us(checker, text):
+    ''' Best check stage microseconds per line of text '''
+    best = None
+    for _ in range(RUNS):
+        result = checker.check_text(text, 'bench.sv')
+        elapsed = result.stats.stages['check'][0]
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6 / text.count("\n")
+
+
+def main(argv):
+    texts = [(f"generated{seed}.sv",
+              svgen.generate(3000, seed=seed, violation_rate=rate,
+                             pragmas=bool(seed % 2)))
+             for seed, rate in enumerate([0.02, 0.02, 0.2, 0.5])]
+    for filepath in argv[1:]:
+        with open(filepath) as fh:
+            texts.append((filepath, fh.read()))
+    differences = compare(texts)
+
+    names = ['line'] + engines()
+    print(f"{'rules':>8} {'rate':>5}"
+          + "".join(f" {name:>8}" for name in names) + "  (us/line)")
+    for rules in ('default', 'embedded', 'wide'):
+        for rate in RATES:
+            text = svgen.generate(NUM_LINES, violation_rate=rate,
+                                  pragmas=rules == 'embedded')
+            if rules == 'wide':
+                text = WIDE_RULES + text
+            checkers = [svdac.Checker(stats=True, ruleset_cache=64,
+                                      engine=name) for name in names]
+            times = [check_us(checker, text) for checker in checkers]
+            print(f"{rules:>8} {rate:>5}"
+                  + "".join(f" {us:>8.2f}" for us in times))
+
+    if differences:
+        print(f"{differences} differences between the engines")
+        return 1
+    print("the engines agree")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,56 @@
+#! /usr/bin/env python3
+"""Wide concatenation benchmark
+
+Checks lines assigning concatenations of hundreds of terms, against a
+growing number of rules matching each line. The right hand variables are
+tokenized and classified once per line, so each extra rule only compares
+their precomputed words.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+
+WIDTHS = [10, 100, 500]
+NUM_LINES = 200
+
+
+def generate(width):
+    ''' Assignments of {..} concatenations width terms wide, with constants
+    and literals mixed in '''
+    lines = []
+    for ii in range(NUM_LINES):
+        terms = []
+        for jj in range(width):
+            if jj % 10 == 0:
+                terms.append(f"{jj % 8}'b0")
+            elif jj % 10 == 5:
+                terms.append(f"PAD_{jj}")
+            else:
+                terms.append(f"bus{jj}_s1_p1_e1")
+        lines.append(f"  bus{ii}_s2_p2_e2 <= {{{', '.join(terms)}}};")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    rule_sets = [
+        ("1 rule", ["s2 <= s1"]),
+        ("3 rules", ["s2 <= s1", "p2 <= p1", "e2 <= e1, s1"]),
+    ]
+    print(f"{'width':>6} {'rules':>8} {'seconds':>9} {'us/term':>8}")
+    for width in WIDTHS:
+        code = generate(width)
+        for name, raw_rules in rule_sets:
+            pragmas = "".join(f"// DACrule: {raw}\n" for raw in raw_rules)
+            start = time.perf_counter()
+            result = svdac.Checker().check_text(pragmas + code)
+            elapsed = time.perf_counter() - start
+            assert not result.violations
+            print(f"{width:>6} {name:>8} {elapsed:>9.3f} "
+                  f"{elapsed / (width * NUM_LINES) * 1e6:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#! /usr/bin/env python3
+"""Design index benchmark
+
+Writes a design of many pipeline stage modules, each in its own file and
+chained by a top module, then times building the design index from
+scratch, updating it after one file changed, and checking the port
+connections. The update should only scan the changed file. One connection
+per stage crosses domains on purpose, the check must find them all.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+import svdac_design  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+NUM_MODULES = [10, 100, 400]
+
+
+def stage_module(index, num_lines):
+    ''' A module taking _s0 signals to _s1, with svgen code as its body '''
+    body = svgen.generate(num_lines, stages=2, seed=index, pragmas=False)
+    body = body[body.index("module"):].split("\n", 1)[1]
+    return (f"module stage_{index} (input logic clk,\n"
+            f"  input logic [7:0] data_s0, output logic [7:0] data_s1);\n"
+            + body)
+
+
+def top_module(count):
+    ''' Chain of stage instances. The data_s0 input of each is driven from
+    a _s1 signal, instead of a _s0 one, the first one excepted '''
+    lines = ["module top (input logic clk);"]
+    for index in range(count):
+        driver = "in_s0" if index == 0 else f"link{index - 1}_s1"
+        lines += [f"  stage_{index} u_stage_{index} (",
+                  "    .clk(clk),",
+                  f"    .data_s0({driver}),",
+                  f"    .data_s1(link{index}_s1)",
+                  "  );"]
+    lines.append("endmodule")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    checker = svdac.Checker()
+    print(f"{'modules':>8} {'full s':>8} {'update s':>9} {'scanned':>8} "
+          f"{'check s':>8}")
+    for count in NUM_MODULES:
+        with tempfile.TemporaryDirectory() as tmp:
+            filepaths = []
+            for index in range(count):
+                filepath = os.path.join(tmp, f"stage_{index}.sv")
+                with open(filepath, 'w') as fh:
+                    fh.write(stage_module(index, 200))
+                filepaths.append(filepath)
+            filepath = os.path.join(tmp, "top.sv")
+            with open(filepath, 'w') as fh:
+                fh.write(top_module(count))
+            filepaths.append(filepath)
+            index_path = os.path.join(tmp, "index.json")
+
+            start = time.perf_counter()
+            index = svdac_design.DesignIndex(index_path, checker.design_key)
+            index.update(filepaths, checker.design_entry)
+            index.save()
+            full = time.perf_counter() - start
+
+            with open(filepaths[0], 'a') as fh:
+                fh.write("// changed\n")
+            start = time.perf_counter()
+            index = svdac_design.DesignIndex(index_path, checker.design_key)
+            index.update(filepaths, checker.design_entry)
+            index.save()
+            update = time.perf_counter() - start
+            assert index.scanned == 1
+
+            start = time.perf_counter()
+            results = checker.check_design(index)
+            check = time.perf_counter() - start
+            assert sum(len(result.violations) for result in results) \
+                == count - 1
+            print(f"{count:>8} {full:>8.3f} {update:>9.3f} "
+                  f"{index.scanned:>8} {check:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
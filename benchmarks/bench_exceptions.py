@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+"""Exception filtering benchmark
+
+Checks svgen code with a growing number of DACexception entries, as
+blocks of reset, debug and scan signals have. The exceptions are searched
+once per line with one compiled pattern, so the check time should barely
+grow with their number. Every prepared line is also checked to be
+excepted exactly when one of the exception strings is in it, as the
+former per variable scan decided.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+import simple_verilog_parser  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+EXCEPTION_COUNTS = [0, 10, 50, 200]
+NUM_LINES = 20000
+
+
+def make_exceptions(count):
+    ''' Reset, debug and scan style names, a few of which occur in svgen
+    code '''
+    kinds = ['srst_', 'dbg_', 'scan_', 'tm_']
+    names = [f"{kinds[ii % 4]}{ii}" for ii in range(count)]
+    if count:
+        names[-1] = "req_id_s3"
+    return names
+
+
+def main():
+    code = svgen.generate(NUM_LINES, pragmas=False)
+    lines = [svdac.PreparedLine(line)
+             for line in simple_verilog_parser.file_to_lines(code)]
+    checker = svdac.Checker()
+    print(f"{'exceptions':>10} {'seconds':>9} {'excepted':>9}")
+    for count in EXCEPTION_COUNTS:
+        exceptions = make_exceptions(count)
+        exception_re = svdac.compile_exceptions(exceptions)
+        excepted = 0
+        for prepared in lines:
+            prepared.excepted = None
+            expected = any(exc for exc in exceptions if exc in prepared.line)
+            assert prepared.is_excepted(exception_re) == expected
+            excepted += expected
+        pragma = f"// DACexception: {', '.join(exceptions)}\n" if count \
+            else ""
+        start = time.perf_counter()
+        checker.check_text(pragma + code)
+        elapsed = time.perf_counter() - start
+        print(f"{count:>10} {elapsed:>9.3f} {excepted:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#! /usr/bin/env python3
+"""Ignore pragma removal benchmark
+
+Times removing ignored lines from a 50k line file for a growing number of
+rules, applying svdac.remove_ignored_lines once per rule against
+svdac.remove_all_ignored_lines for all of them. Rules mostly share the
+default ignore, as expanded embedded rules do. The single scan should not
+grow with the number of rules.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+
+RULE_COUNTS = [1, 10, 100, 400]
+NUM_LINES = 50000
+
+
+def generate(num_lines):
+    ''' Pipeline code with an ignore pragma on every 50th line '''
+    lines = []
+    for ii in range(num_lines):
+        stage = ii % 6
+        pragma = ""
+        if ii % 50 == 0:
+            pragma = " // noDAC;" if ii % 100 else " // OKreg"
+        lines.append(f"  data_s{stage + 1} <= data_s{stage};{pragma}")
+    return "\n".join(lines) + "\n"
+
+
+def make_rules(count):
+    ''' count rules, one in ten with its own ignore '''
+    return [svdac.DACrule(f"s{ii}", [f"s{ii}"],
+                          ignore="OKreg" if ii % 10 == 9 else "noDAC")
+            for ii in range(count)]
+
+
+def main():
+    code = generate(NUM_LINES)
+    print(f"{'rules':>6} {'per rule s':>11} {'one scan s':>11}")
+    for count in RULE_COUNTS:
+        rules = make_rules(count)
+        start = time.perf_counter()
+        legacy = code
+        for rule in rules:
+            legacy = svdac.remove_ignored_lines(legacy, rule)
+        per_rule = time.perf_counter() - start
+        start = time.perf_counter()
+        single = svdac.remove_all_ignored_lines(code, rules)
+        one_scan = time.perf_counter() - start
+        # Only trailing blank lines may differ
+        assert single.rstrip("\n") == legacy.rstrip("\n")
+        print(f"{count:>6} {per_rule:>11.3f} {one_scan:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#! /usr/bin/env python3
+"""Large file ingestion benchmark
+
+Writes svgen files of growing size and checks each one read into memory
+with Checker.check_file and memory mapped with Checker.check_mapped,
+comparing time and peak traced memory. The results must be the same.
+Memory of the mapped check should stay flat as the file grows.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+SIZES = [10000, 50000, 200000]
+
+
+def measure(check, filepath):
+    ''' (result, seconds, peak MB) of check(filepath) '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = check(filepath)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    checker = svdac.Checker()
+    print(f"{'lines':>8} {'file MB':>8} {'read s':>7} {'read MB':>8} "
+          f"{'mmap s':>7} {'mmap MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, "bench.sv")
+        for size in SIZES:
+            with open(filepath, 'w') as fh:
+                fh.write(svgen.generate(size))
+            read, read_s, read_mb = measure(checker.check_file, filepath)
+            mapped, mmap_s, mmap_mb = measure(checker.check_mapped, filepath)
+            assert read.passes == mapped.passes
+            assert read.violations == mapped.violations
+            print(f"{size:>8} {os.path.getsize(filepath) / 1e6:>8.1f} "
+                  f"{read_s:>7.2f} {read_mb:>8.1f} "
+                  f"{mmap_s:>7.2f} {mmap_mb:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#! /usr/bin/env python3
+"""Bounded output benchmark
+
+Times 'svdac.py' on a file where every tenth assignment crosses a stage,
+with its full colored report against --format summary, --format count
+and --max-violations 10. Output goes to a pipe, as in CI logs. The count
+must match the full run's, and the limited run must stop early.
+"""
+import os
+import sys
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from benchmarks import svgen  # noqa: E402
+
+NUM_LINES = 50000
+MODES = [
+    ('full report', []),
+    ('summary', ['--format', 'summary']),
+    ('count', ['--format', 'count']),
+    ('max 10', ['--max-violations', '10']),
+]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, "bench.sv")
+        with open(filepath, 'w') as fh:
+            fh.write(svgen.generate(NUM_LINES, violation_rate=0.1))
+        print(f"{'mode':<12} {'seconds':>8} {'output kB':>10}")
+        outputs = {}
+        for name, options in MODES:
+            start = time.perf_counter()
+            done = subprocess.run(
+                [sys.executable, os.path.join(ROOT, "svdac.py"), *options,
+                 filepath], capture_output=True, text=True,
+                env=dict(os.environ, TERM='xterm-color'))
+            elapsed = time.perf_counter() - start
+            outputs[name] = done.stdout
+            print(f"{name:<12} {elapsed:>8.3f} "
+                  f"{len(done.stdout) / 1024:>10.1f}")
+        summary = outputs['full report'].splitlines()[-1]
+        assert f"Rule violations: {outputs['count'].strip()}" in summary
+        assert "stopped at the violation limit" in outputs['max 10']
+
+
+if __name__ == '__main__':
+    main()
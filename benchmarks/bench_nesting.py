@@ -0,0 +1,69 @@
+#! /usr/bin/env python3
+"""Deep nesting stress benchmark
+
+Times simple_verilog_parser.file_to_lines on machine generated code nested
+thousands of levels deep: else-if chains where each else opens a begin
+block, plain begin blocks, and parenthesized expressions. The walk keeps
+its own stack, so this runs far past the recursion limit and the time per
+level stays flat.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import simple_verilog_parser  # noqa: E402
+
+DEPTHS = [1000, 5000, 10000, 20000]
+
+
+def else_if_chain(depth):
+    ''' if/else-if chain, every else a begin block holding the next if.
+    Returns the code and the number of lines it parses to '''
+    lines = ["module chain (input logic clk);",
+             "  always_ff @(posedge clk) begin"]
+    for ii in range(depth):
+        lines += [f"    if (sel_s0 == {ii}) begin",
+                  f"      data_s1 <= in{ii}_s0;",
+                  "    end else begin"]
+    lines.append("      data_s1 <= '0;")
+    lines += ["    end"] * depth
+    lines += ["  end", "endmodule"]
+    # Plus the module and always_ff lines
+    return "\n".join(lines) + "\n", depth + 3
+
+
+def begin_blocks(depth):
+    ''' begin blocks nested depth deep, with a line in each '''
+    lines = ["module blocks (input logic clk);"]
+    for ii in range(depth):
+        lines += [f"  begin : level_{ii}", f"    data{ii}_s1 <= data{ii}_s0;"]
+    lines += ["  end"] * depth
+    lines.append("endmodule")
+    return "\n".join(lines) + "\n", depth + 1
+
+
+def parentheses(depth):
+    ''' One assignment with an expression nested depth parentheses deep '''
+    code = ("assign sum_s0 = " + "(a_s0 + " * depth + "b_s0"
+            + ")" * depth + ";\n")
+    return code, 1
+
+
+def main():
+    print(f"{'case':>14} {'depth':>7} {'seconds':>9} {'us/level':>9}")
+    for name, generate in [("else-if chain", else_if_chain),
+                           ("begin blocks", begin_blocks),
+                           ("parentheses", parentheses)]:
+        for depth in DEPTHS:
+            code, num_lines = generate(depth)
+            start = time.perf_counter()
+            lines = simple_verilog_parser.file_to_lines(code)
+            elapsed = time.perf_counter() - start
+            assert len(lines) == num_lines, (name, depth, len(lines))
+            print(f"{name:>14} {depth:>7} {elapsed:>9.3f} "
+                  f"{elapsed / depth * 1e6:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
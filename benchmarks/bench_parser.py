@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+"""Parser scaling benchmark
+
+Times simple_verilog_parser.file_to_lines on svgen pipeline code from
+1k to 200k lines. With a linear token walk the time per line stays flat as
+the file grows. Also compares peak memory of file_to_lines on the whole
+text against iter_lines streaming the same code from a file.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import simple_verilog_parser  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+SIZES = [1000, 5000, 20000, 50000, 100000, 200000]
+
+
+def peak_memory(func):
+    ''' Peak traced memory in MB while running func '''
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    print(f"{'lines':>8} {'seconds':>9} {'us/line':>8} "
+          f"{'stream s':>9} {'list MB':>8} {'stream MB':>9}")
+    for size in SIZES:
+        code = svgen.generate(size)
+        start = time.perf_counter()
+        lines = simple_verilog_parser.file_to_lines(code)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        count = sum(1 for _ in simple_verilog_parser.iter_lines(
+            io.StringIO(code)))
+        streamed = time.perf_counter() - start
+        assert count == len(lines)
+        del lines
+        with tempfile.TemporaryFile('w+') as fh:
+            fh.write(code)
+            del code
+            fh.seek(0)
+            # Reading the file is part of the whole-file parse's footprint
+            listed = peak_memory(lambda: simple_verilog_parser.file_to_lines(
+                fh.read()))
+            fh.seek(0)
+            stream = peak_memory(lambda: sum(
+                1 for _ in simple_verilog_parser.iter_lines(fh)))
+        print(f"{size:>8} {elapsed:>9.3f} {elapsed / size * 1e6:>8.2f} "
+              f"{streamed:>9.3f} {listed:>8.1f} {stream:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
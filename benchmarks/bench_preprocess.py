@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+"""Preprocessing benchmark
+
+Builds files with many block comments and `defines and times
+simple_verilog_parser.preprocess against legacy_preprocess, the replace-all
+reference in tests/test_preprocess.py, which also checks their output is
+byte-identical.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import simple_verilog_parser  # noqa: E402
+from tests.test_preprocess import legacy_preprocess  # noqa: E402
+
+SIZES = [100, 500, 2000]
+
+
+def generate(num_blocks):
+    ''' Module with num_blocks groups of comments, macros and code '''
+    lines = ["module bench (input logic clk);"]
+    for ii in range(num_blocks):
+        lines += [
+            f"  /* stage {ii} block comment",
+            f"     data_s{ii % 8} <= junk; */",
+            f"  `define STAGE_{ii} {ii}",
+            f"  `define CALC_{ii}(x) \\",
+            f"      (x + `STAGE_{ii})",
+            f"  always_ff @(posedge clk) begin : blk_{ii}",
+            f"    if (valid_s{ii % 8}) data_s{ii % 8 + 1} <= data_s{ii % 8};"
+            " // line comment",
+            "  end",
+        ]
+    lines.append("endmodule")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    print(f"{'blocks':>8} {'legacy s':>9} {'single s':>9} {'speedup':>8}")
+    for size in SIZES:
+        code = generate(size)
+        start = time.perf_counter()
+        legacy_preprocess(code)
+        legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        simple_verilog_parser.preprocess(code)
+        single = time.perf_counter() - start
+        print(f"{size:>8} {legacy:>9.3f} {single:>9.3f} "
+              f"{legacy / single:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
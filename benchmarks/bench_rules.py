@@ -0,0 +1,86 @@
+#! /usr/bin/env python3
+"""Embedded rule expansion benchmark
+
+Times svdac.process_raw_rules on wide embedded ranges such as
+'s0-63, p0-63, e0-63 = ...', up to tens of thousands of derived rules.
+For the smaller sizes the result is checked against the former quadratic
+expansion, kept here as legacy_process_raw_rules, which is timed too.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+
+WIDTHS = [16, 64, 256, 1024, 4096]
+# The legacy expansion is quadratic, only time it this far
+LEGACY_WIDTH = 1024
+
+
+def make_raw_rules(width):
+    ''' Embedded rules over width pipe stages, with overrides '''
+    top = width - 1
+    return [
+        f" s0-{top}, p0-{top}, e0-{top} = s0-{top}, p0-{top}, e0-{top},"
+        f" [0-{top}] -- OKcomb",
+        f" s1-{top}, p1-{top}, e1-{top} <= s0-{top - 1}, p0-{top - 1},"
+        f" e0-{top - 1}, [0-{top - 1}] -- OKreg",
+        # Overrides part of the first rule
+        f" s0-{top // 2} = s0-{top // 2}, c0-{top // 2}",
+    ]
+
+
+def legacy_process_raw_rules(raw_rules):
+    ''' process_raw_rules as it was, overriding and excluding by comparing
+    every rule with every other rule '''
+    rules = []
+    for raw in raw_rules:
+        assign = "<=" if "<=" in raw else "="
+        lh, rem = raw.split(assign)
+        if '--' in rem:
+            rh, ignore = rem.split('--')
+            ignore = ignore.strip()
+        else:
+            rh = rem
+            ignore = svdac.default_rules[0].ignore
+        left_arr, lhstride = svdac.extract_raw_range(lh)
+        right_arr, rhstride = svdac.extract_raw_range(rh)
+        for ii in range(len(left_arr)):
+            new_rule = svdac.DACrule(left_arr[ii],
+                                     right_arr[ii % lhstride::rhstride],
+                                     assign, ignore)
+            if new_rule in rules:
+                rules = [new_rule if jj == new_rule else jj for jj in rules]
+            else:
+                rules.append(new_rule)
+    for rule in rules:
+        for other in rules:
+            if (rule.left in other.left
+                and not (rule.left == other.left)
+                    and (rule.assign == other.assign)):
+                if rule.exclude:
+                    rule.exclude.append(other.left)
+                else:
+                    rule.exclude = [other.left]
+    return rules
+
+
+def main():
+    print(f"{'width':>6} {'rules':>7} {'seconds':>9} {'legacy s':>9}")
+    for width in WIDTHS:
+        raw_rules = make_raw_rules(width)
+        start = time.perf_counter()
+        rules = svdac.process_raw_rules(raw_rules)
+        elapsed = time.perf_counter() - start
+        legacy = ""
+        if width <= LEGACY_WIDTH:
+            start = time.perf_counter()
+            expected = legacy_process_raw_rules(raw_rules)
+            legacy = f"{time.perf_counter() - start:.3f}"
+            assert repr(rules) == repr(expected)
+        print(f"{width:>6} {len(rules):>7} {elapsed:>9.3f} {legacy:>9}")
+
+
+if __name__ == '__main__':
+    main()
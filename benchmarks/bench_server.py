@@ -0,0 +1,60 @@
+#! /usr/bin/env python3
+"""Server latency benchmark
+
+Starts 'svdac.py --serve' on a temporary socket and times checking one
+file per process, as a pre-commit hook does: a cold 'svdac.py' run against
+'svdac_client.py' talking to the warm server, and against a bare Python
+start for reference. The client's report must match the cold run's.
+"""
+import os
+import sys
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+import svdac_server  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+RUNS = 20
+
+
+def timed(command):
+    ''' Output and mean milliseconds of running command RUNS times '''
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        done = subprocess.run(command, capture_output=True, text=True)
+    return done.stdout, (time.perf_counter() - start) / RUNS * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "svdac.sock")
+        filepath = os.path.join(tmp, "bench.sv")
+        with open(filepath, 'w') as fh:
+            fh.write(svgen.generate(2000))
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "svdac.py"), "--serve",
+             socket_path], stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.05)
+            python, bare = timed([sys.executable, "-c", "pass"])
+            cold, cold_ms = timed([sys.executable,
+                                   os.path.join(ROOT, "svdac.py"), filepath])
+            warm, warm_ms = timed([sys.executable,
+                                   os.path.join(ROOT, "svdac_client.py"),
+                                   "--socket", socket_path,
+                                   "--no-fallback", filepath])
+            assert warm == cold
+        finally:
+            svdac_server.request(socket_path, {'op': 'shutdown'})
+            server.wait()
+    print(f"{'python start':>14} {bare:>8.1f} ms")
+    print(f"{'cold svdac':>14} {cold_ms:>8.1f} ms")
+    print(f"{'client':>14} {warm_ms:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
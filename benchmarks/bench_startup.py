@@ -0,0 +1,178 @@
+#! /usr/bin/env python3
+"""Cold start benchmark with a regression threshold
+
+svdac.py runs once per file from hooks, so its start up counts. Times, as
+the best of a few fresh processes each:
+
+compile: compiling svdac.py, which python does on every run of a script
+import:  svdac_core as 'svdac.py --help' imports it, in milliseconds as
+         python -X importtime reports
+help:    'svdac.py --help'
+check:   'svdac.py' on a small file
+cached:  the same with --cache-dir, served from the cache
+
+the runs in wall milliseconds over a bare 'python -c pass', so the
+interpreter's own start up doesn't count. The modules are byte compiled
+first, as in an installed tree, even when PYTHONDONTWRITEBYTECODE is set.
+The times are compared against the 'startup' entry of baseline.json like
+benchmarks.run does, and running svdac.py must not load any of the modules
+it only imports when needed.
+
+Usage: python -m benchmarks.bench_startup [--update] [--tolerance F]
+"""
+import os
+import sys
+import json
+import argparse
+import compileall
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from benchmarks import svgen  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SVDAC_PY = os.path.join(ROOT, 'svdac.py')
+# Imported by svdac only where they are used
+LAZY = ['svdac_cache', 'svdac_ingest', 'svdac_design', 'svdac_server',
+        'concurrent.futures', 'threading', 'socket', 'json', 'numpy']
+# Extra tolerance in milliseconds, start up times are small and noisy
+SLACK_MS = 3.0
+
+
+def best_ms(command, runs):
+    ''' Best wall milliseconds of running command in runs fresh processes '''
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        # The exit status is the number of violations
+        subprocess.run(command, capture_output=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compile_ms(runs):
+    ''' Best milliseconds of compiling svdac.py, never cached for a script '''
+    with open(SVDAC_PY) as fh:
+        source = fh.read()
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        compile(source, SVDAC_PY, 'exec')
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def script_imports():
+    ''' {module: cumulative milliseconds} imported by 'svdac.py --help',
+    by -X importtime '''
+    done = subprocess.run(
+        [sys.executable, '-X', 'importtime', SVDAC_PY, '--help'],
+        cwd=ROOT, check=True, capture_output=True, text=True)
+    imports = {}
+    for line in done.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            imports[fields[2].strip()] = int(fields[1]) / 1000
+    return imports
+
+
+def import_ms(runs):
+    ''' Best cumulative milliseconds of svdac.py importing svdac_core '''
+    return min(script_imports()['svdac_core'] for _ in range(runs))
+
+
+def loaded_lazy_modules():
+    ''' The LAZY modules loaded by running svdac.py '''
+    imports = script_imports()
+    return [module for module in LAZY if module in imports]
+
+
+def measure(runs):
+    svdac_py = SVDAC_PY
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, 'bench.sv')
+        with open(filepath, 'w') as fh:
+            fh.write(svgen.generate(200))
+        cache_dir = os.path.join(tmp, 'cache')
+        python = best_ms([sys.executable, '-c', 'pass'], runs)
+        # Fill the cache first
+        subprocess.run([sys.executable, svdac_py, '--cache-dir', cache_dir,
+                        filepath], capture_output=True)
+        return {
+            'compile': compile_ms(runs),
+            'import': import_ms(runs),
+            'help': best_ms([sys.executable, svdac_py, '--help'],
+                            runs) - python,
+            'check': best_ms([sys.executable, svdac_py, filepath],
+                             runs) - python,
+            'cached': best_ms([sys.executable, svdac_py, '--cache-dir',
+                               cache_dir, filepath], runs) - python,
+        }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Time svdac start up against a stored baseline")
+    parser.add_argument('--runs', type=int, default=10,
+                        help='processes per measurement, the best is kept '
+                             '(default 10)')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline JSON file (default benchmarks/'
+                             'baseline.json)')
+    parser.add_argument('--tolerance', type=float,
+                        help='allowed slowdown over the baseline, 0.25 is '
+                             '25%% (default from the baseline file)')
+    parser.add_argument('--update', action='store_true',
+                        help='write the measurements as the new baseline')
+    args = parser.parse_args(argv[1:])
+
+    stored = {'tolerance': 0.25, 'sizes': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            stored = json.load(fh)
+    tolerance = args.tolerance
+    if tolerance is None:
+        tolerance = stored['tolerance']
+    baseline = stored.get('startup', {})
+
+    # Without bytecode every run would also compile svdac_core
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+    failures = 0
+    loaded = loaded_lazy_modules()
+    if loaded:
+        print(f"svdac.py loads {', '.join(loaded)}")
+        failures += 1
+    measured = measure(args.runs)
+    print(f"{'start':>7} {'ms':>7} {'baseline':>9}")
+    for name, ms in measured.items():
+        base = baseline.get(name)
+        note = ""
+        if base:
+            note = f"{ms / base:>6.2f}x"
+            if ms > base * (1 + tolerance) + SLACK_MS:
+                note += "  REGRESSION"
+                failures += 1
+        print(f"{name:>7} {ms:>7.1f} {base if base else '-':>9} {note}")
+
+    if args.update:
+        stored['startup'] = {name: round(ms, 1)
+                             for name, ms in measured.items()}
+        with open(args.baseline, 'w') as fh:
+            json.dump(stored, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if failures:
+        print(f"{failures} start up regressions")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,131 @@
+#! /usr/bin/env python3
+"""Benchmark runner with regression thresholds
+
+Generates seeded pipeline code with svgen at a few sizes, checks it with
+the Checker collecting stats, and reports microseconds per line for the
+parse (strip, space, tokenize, walk), rule compile and check stages
+separately, the best of a few repeats. Rule compile does not grow with
+the file, so it is reported in microseconds per file. The numbers are
+compared against baseline.json: a stage slower than its baseline by more
+than the tolerance, or different pass and violation counts, fail the run.
+
+Timings depend on the machine, refresh the baseline with --update on the
+machine the comparisons are made on.
+
+Usage: python -m benchmarks.run [--sizes N ...] [--update] [--tolerance F]
+"""
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SIZES = [1000, 10000, 50000]
+# Checking stages reported: the stats stages they add up, and whether they
+# are reported per line rather than per file
+STAGES = {
+    'parse': (['strip', 'space', 'tokenize', 'walk'], True),
+    'rules': (['rules'], False),
+    'check': (['check'], True),
+}
+
+
+def measure(size, repeats, seed=0):
+    ''' Check generated code of size lines repeats times, return the best
+    microseconds of each stage and the result counts '''
+    code = svgen.generate(size, seed=seed)
+    num_lines = code.count("\n")
+    checker = svdac.Checker(stats=True)
+    best = {}
+    for _ in range(repeats):
+        result = checker.check_text(code, f"bench_{size}.sv")
+        for stage, (names, per_line) in STAGES.items():
+            us = result.stats.stage_seconds(names) * 1e6
+            if per_line:
+                us /= num_lines
+            best[stage] = min(best.get(stage, us), us)
+    best['passes'] = result.passes
+    best['violations'] = len(result.violations)
+    return best
+
+
+def compare(size, measured, baseline, tolerance):
+    ''' Print one size's stages against its baseline, return the number of
+    regressions '''
+    failures = 0
+    for key in ['passes', 'violations']:
+        if baseline and baseline.get(key) != measured[key]:
+            print(f"{size:>7} {key} changed: {baseline.get(key)} -> "
+                  f"{measured[key]}")
+            failures += 1
+    for stage, (_, per_line) in STAGES.items():
+        us = measured[stage]
+        base = baseline.get(stage) if baseline else None
+        note = ""
+        if base:
+            ratio = us / base
+            note = f"{ratio:>6.2f}x"
+            if ratio > 1 + tolerance:
+                note += "  REGRESSION"
+                failures += 1
+        unit = "us/line" if per_line else "us"
+        print(f"{size:>7} {stage:>6} {unit:>7} {us:>9.2f} "
+              f"{base if base else '-':>9} {note}")
+    return failures
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Time the checker stages against a stored baseline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='generated file sizes in lines')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='runs per size, the best is kept (default 3)')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline JSON file (default benchmarks/'
+                             'baseline.json)')
+    parser.add_argument('--tolerance', type=float,
+                        help='allowed slowdown over the baseline, 0.25 is '
+                             '25%% (default from the baseline file)')
+    parser.add_argument('--update', action='store_true',
+                        help='write the measurements as the new baseline')
+    args = parser.parse_args(argv[1:])
+
+    stored = {'tolerance': 0.25, 'sizes': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            stored = json.load(fh)
+    tolerance = args.tolerance
+    if tolerance is None:
+        tolerance = stored['tolerance']
+
+    print(f"{'lines':>7} {'stage':>6} {'unit':>7} {'time':>9} "
+          f"{'baseline':>9}")
+    failures = 0
+    for size in args.sizes:
+        measured = measure(size, args.repeats)
+        baseline = stored['sizes'].get(str(size))
+        failures += compare(size, measured, baseline, tolerance)
+        stored['sizes'][str(size)] = {
+            key: round(value, 3) if isinstance(value, float) else value
+            for key, value in measured.items()}
+
+    if args.update:
+        with open(args.baseline, 'w') as fh:
+            json.dump(stored, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if failures:
+        print(f"{failures} regressions over {tolerance:.0%} tolerance")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,185 @@
+#! /usr/bin/env python3
+"""Seeded synthetic System Verilog generator
+
+Generates pipelined modules like the ones the checker runs on: signals
+named for their pipe stage (_s0 to _sN), always blocks with if/else and
+case nesting, block and line comments, `define macros, and embedded
+DACrule and DACexception pragmas. The same seed and sizes always give the
+same code, so timings and results can be compared between runs.
+
+A fraction of the assignments read a signal from the wrong stage, so the
+checker has violations to report, and some of those carry the noDAC
+ignore pragma.
+
+Usage: svgen.py [--lines N] [--stages N] [--seed N] [-o out.sv]
+"""
+import sys
+import random
+import argparse
+
+# Signal names, a stage suffix is added to each
+NAMES = ['data', 'addr', 'valid', 'cnt', 'tag', 'mask', 'req_id', 'ecc']
+OPS = ['+', '-', '&', '|', '^']
+
+
+class Generator:
+    ''' Build one module of roughly num_lines lines.
+
+    stages: number of pipe stages, signals go from _s0 to _s<stages>
+    depth: deepest if/case nesting inside an always block
+    violation_rate: share of assignments that break the stage rules
+    pragmas: embed DACrule and DACexception pragmas
+    '''
+    def __init__(self, num_lines, stages=8, seed=0, depth=3,
+                 violation_rate=0.02, pragmas=True):
+        self.num_lines = num_lines
+        self.stages = stages
+        self.depth = depth
+        self.violation_rate = violation_rate
+        self.pragmas = pragmas
+        self.rand = random.Random(seed)
+        self.lines = []
+
+    def signal(self, stage, array=False):
+        name = f"{self.rand.choice(NAMES)}_s{stage}"
+        if array and self.rand.random() < 0.3:
+            top = self.rand.randrange(1, 8)
+            return f"{name}[{top}:0]"
+        return name
+
+    def expression(self, stage, terms=None):
+        ''' Right hand side reading from stage, sometimes from the wrong one
+        or through a macro or function call '''
+        terms = terms or self.rand.randrange(1, 4)
+        parts = []
+        for _ in range(terms):
+            read = stage
+            if self.rand.random() < self.violation_rate:
+                read = (stage + self.rand.randrange(1, self.stages)) \
+                    % self.stages
+            roll = self.rand.random()
+            if roll < 0.1:
+                parts.append(f"`INC({self.signal(read)})")
+            elif roll < 0.2:
+                parts.append(f"calc({self.signal(read)}, 4'h{terms:x})")
+            elif roll < 0.25:
+                parts.append("WIDTH")
+            else:
+                parts.append(self.signal(read, array=True))
+        ops = [f" {self.rand.choice(OPS)} " for _ in parts[1:]] + [""]
+        return "".join(part + op for part, op in zip(parts, ops))
+
+    def assignment(self, indent, stage, assign):
+        left = stage + 1 if assign == "<=" else stage
+        line = (f"{indent}{self.signal(left, array=True)} {assign} "
+                f"{self.expression(stage)};")
+        roll = self.rand.random()
+        if roll < 0.01:
+            line += " // noDAC"
+        elif roll < 0.05:
+            line += " // line comment"
+        self.lines.append(line)
+
+    def statements(self, indent, stage, assign, depth):
+        ''' A few assignments, some wrapped in if/else or case blocks '''
+        for _ in range(self.rand.randrange(1, 4)):
+            roll = self.rand.random()
+            if depth <= 0 or roll < 0.5:
+                self.assignment(indent, stage, assign)
+            elif roll < 0.8:
+                self.lines.append(
+                    f"{indent}if ({self.signal(stage)} == "
+                    f"{self.rand.randrange(16)}) begin")
+                self.statements(indent + "  ", stage, assign, depth - 1)
+                if self.rand.random() < 0.5:
+                    self.lines.append(f"{indent}end else begin")
+                    self.statements(indent + "  ", stage, assign, depth - 1)
+                self.lines.append(f"{indent}end")
+            else:
+                self.lines.append(f"{indent}case ({self.signal(stage)})")
+                for value in range(self.rand.randrange(1, 4)):
+                    self.lines.append(f"{indent}  2'd{value}: begin")
+                    self.statements(indent + "    ", stage, assign,
+                                    depth - 1)
+                    self.lines.append(f"{indent}  end")
+                left = stage + 1 if assign == "<=" else stage
+                self.lines.append(f"{indent}  default: "
+                                  f"{self.signal(left)} {assign} '0;")
+                self.lines.append(f"{indent}endcase")
+
+    def block(self, index):
+        stage = self.rand.randrange(self.stages)
+        if self.rand.random() < 0.2:
+            self.lines += [f"  /* stage {stage} block {index}",
+                           f"     {self.signal(stage + 1)} <= "
+                           f"{self.signal(stage + 3)}; */"]
+        if self.rand.random() < 0.5:
+            self.lines.append(f"  always_ff @(posedge clk) begin : "
+                              f"blk_{index}")
+            self.statements("    ", stage, "<=", self.depth)
+        else:
+            self.lines.append("  always_comb begin")
+            self.statements("    ", stage, "=", self.depth)
+        self.lines.append("  end")
+        if self.rand.random() < 0.2:
+            self.lines.append(f"  assign {self.signal(stage)} = "
+                              f"{self.expression(stage)};")
+
+    def generate(self):
+        top = self.stages - 1
+        self.lines = []
+        if self.pragmas:
+            self.lines += [
+                f"// DACrule: s1-{self.stages} <= s0-{top}, [0-{top}]",
+                f"// DACrule: s0-{top} = s0-{top}, [0-{top}]",
+                "// DACexception: WIDTH, calc",
+            ]
+        self.lines += [
+            "`define INC(x) \\",
+            "    (x + 1)",
+            "`define WIDTH_M 8",
+            "module bench_top (input logic clk);",
+        ]
+        index = 0
+        while len(self.lines) < self.num_lines:
+            self.block(index)
+            index += 1
+        self.lines.append("endmodule")
+        return "\n".join(self.lines) + "\n"
+
+
+def generate(num_lines, stages=8, seed=0, **kwargs):
+    ''' Seeded synthetic pipeline code of roughly num_lines lines, see
+    Generator for the other options '''
+    return Generator(num_lines, stages, seed, **kwargs).generate()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic pipelined System Verilog")
+    parser.add_argument('--lines', type=int, default=1000,
+                        help='approximate number of lines (default 1000)')
+    parser.add_argument('--stages', type=int, default=8,
+                        help='number of pipe stages (default 8)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed (default 0)')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='deepest if/case nesting (default 3)')
+    parser.add_argument('--violation-rate', type=float, default=0.02,
+                        help='share of assignments reading the wrong stage')
+    parser.add_argument('--no-pragmas', action='store_true',
+                        help='leave out the DACrule and DACexception pragmas')
+    parser.add_argument('-o', '--output', help='output file, else stdout')
+    args = parser.parse_args(argv[1:])
+    code = generate(args.lines, args.stages, args.seed, depth=args.depth,
+                    violation_rate=args.violation_rate,
+                    pragmas=not args.no_pragmas)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(code)
+    else:
+        sys.stdout.write(code)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
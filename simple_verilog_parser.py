@@ -5,6 +5,7 @@ This parser will take verilog and try to break it down into formal lines of veri
 """
 import sys
 import re
+import time
 
 # Delineators for case and if, added to code lines
 if_del = ':if:'
@@ -18,179 +19,268 @@ tokenizer = re.compile(r'[\S]+')
 comment_line_re = re.compile(r'//.*')
 comment_block_re = re.compile(r'/\*.*?\*/', re.DOTALL)
 
-VERBOSE = False
+# Single pass preprocessing: where comments and macros may start, what ends
+# them, and all token spacing rules combined into one pattern
+killed_macro = '__killed_macro__'
+strip_start_re = re.compile(r'//|/\*|`|\\\n')
+block_scan_re = re.compile(r'\*/|//')
+macro_scan_re = re.compile(r'\n|//|/\*')
+keywords = ['begin', 'end', 'if', 'else', 'case', 'endcase', 'for',
+            'endgenerate', 'endfunction']
+spacing_re = re.compile(
+    r'::|[();:]'
+    rf'|(?<!\w)(?:{"|".join(keywords)})(?!\w)'
+    r'|(?<![<=>!])(?:<=|=)(?![<=>])')
 
 
-class StrLine(str):
-    ''' StrLine class is string class plus line number '''
-    def __new__(cls, value, *args, **kwargs):
-        return super().__new__(cls, value)
+class Line:
+    ''' A formalized line of code. text is the code itself and conditions
+    the innermost Condition of the if/case blocks it is in, or None.
+    str() gives the whole line, with the conditions appended '''
+    __slots__ = ('text', 'linenum', 'conditions')
 
-    def __init__(self, string, linenum):
+    def __init__(self, text, linenum, conditions=None):
+        self.text = text
         self.linenum = linenum
+        self.conditions = conditions
 
-    def __add__(self, other):
-        return StrLine(str(self) + other, self.linenum)
+    def __str__(self):
+        if self.conditions is None:
+            return self.text
+        return self.text + "".join(f" {delineator} {condition}"
+                                   for delineator, condition
+                                   in self.conditions)
 
-    def split(self, sep=None, maxsplit=-1):
-        pieces = super().split(sep, maxsplit)
-        return [StrLine(ii, self.linenum) for ii in pieces]
+    def __repr__(self):
+        return f"Line({self.text!r}, {self.linenum}, {self.conditions!r})"
 
+    def __bool__(self):
+        # Empty lines are dropped
+        return bool(self.text or self.conditions)
 
-# Create a super simple parser
-def check_endline(token, lines, line):
-    if token in [';', 'for', 'endgenerate', 'endfunction']:
-        lines.append(StrLine(line, token.linenum))
-        if VERBOSE:
-            print(f"endLine: {line}")
-        line = ""
-    return line
 
+class Condition:
+    ''' The condition of an if/case block, linked to the Condition of the
+    block around it. Every line of the block shares the same instance.
+    Iterating gives (delineator, condition) pairs, innermost first '''
+    __slots__ = ('delineator', 'condition', 'parent')
 
-def check_token(token, tokens, lines, line):
-    if token == "(":
-        # remove function names
-        if " " in line:
-            last_token = line.split()[-1]
-            if hasalpha_re.search(last_token):
-                line = line.replace(last_token, "")
-        tokens, pline = enter_paren(tokens)
-        line += pline
-    elif token == 'if':
-        lines.append(StrLine(line, token.linenum))
-        line = ""
-        if VERBOSE:
-            print(f"if Line: {line}")
-        tokens, ilines = enter_if(tokens)
-        lines += ilines
-    elif token == 'case':
-        lines.append(StrLine(line, token.linenum))
-        line = ""
-        if VERBOSE:
-            print(f"casLine: {line}")
-        tokens, clines = enter_case(tokens)
-        lines += clines
-    elif (token == 'begin'):
-        lines.append(StrLine(line, token.linenum))
-        line = ""
-        if VERBOSE:
-            print(f"begLine: {line}")
-        tokens, klines = enter_keyword(tokens, 'begin', 'end')
-        lines += klines
-    else:
-        line += token + " "
-    return tokens, line
+    def __init__(self, delineator, condition, parent=None):
+        self.delineator = delineator
+        self.condition = condition
+        self.parent = parent
+
+    def __iter__(self):
+        node = self
+        while node is not None:
+            yield node.delineator, node.condition
+            node = node.parent
+
+    def __repr__(self):
+        return f"Condition({self.delineator!r}, {self.condition!r}, ...)"
+
+
+class TokenStream:
+    ''' Tokens from an iterable of (linenum, tokens) source lines, with one
+    token of lookahead. Tokens are plain strings, linenum is the line
+    number of the last token popped. The walk only ever moves forward, so
+    tokens can be produced lazily while it runs.
+    log is an optional callable for verbose parse messages '''
+    def __init__(self, token_lines, log=None):
+        self.token_lines = iter(token_lines)
+        self.tokens = ()
+        self.index = 0
+        self.linenum = 0
+        self.next_linenum = 0
+        self.log = log
+        self.advance()
+
+    def advance(self):
+        ''' Move the lookahead to the next token, reading source lines as
+        needed '''
+        while self.index == len(self.tokens):
+            entry = next(self.token_lines, None)
+            if entry is None:
+                self.next_token = None
+                return
+            self.next_linenum, self.tokens = entry
+            self.index = 0
+        self.next_token = self.tokens[self.index]
+        self.index += 1
+
+    def __bool__(self):
+        return self.next_token is not None
+
+    def pop(self):
+        token = self.next_token
+        if token is None:
+            raise IndexError("pop from an empty token stream")
+        self.linenum = self.next_linenum
+        if self.index < len(self.tokens):
+            self.next_token = self.tokens[self.index]
+            self.index += 1
+        else:
+            self.advance()
+        return token
+
+    def peek(self):
+        ''' Next token without consuming it, None at end of stream '''
+        return self.next_token
+
+    def skip(self, count):
+        for _ in range(count):
+            if not self:
+                break
+            self.pop()
+
+
+# Create a super simple parser. Nesting is tracked with an explicit stack of
+# Blocks rather than recursion, so any depth of begin/if/case or parentheses
+# can be parsed.
+endline_words = {';', 'for', 'endgenerate', 'endfunction'}
+block_logs = {'if': "if Line", 'case': "casLine"}
+
+
+class Block:
+    ''' An open block of the walk. state is what the block expects next:
+      'body'   code up to closeword, any word for the top level
+      'if'     the condition of an if, 'case' the condition of a case
+      'then'   the if branch, 'else' the else branch
+      'after'  an optional else, 'done' nothing more
+    context is the innermost Condition of its lines, line the code built
+    so far when a nested block was opened '''
+    __slots__ = ('state', 'closeword', 'context', 'log_word', 'line')
+
+    def __init__(self, state, closeword=None, context=None,
+                 log_word="begLine"):
+        self.state = state
+        self.closeword = closeword
+        self.context = context
+        self.log_word = log_word
+        self.line = ""
+
+
+def remove_function_name(line):
+    ''' Drop the function name called by a following '(' '''
+    if " " in line:
+        last_token = line.split()[-1]
+        if hasalpha_re.search(last_token):
+            line = line.replace(last_token, "")
+    return line
 
 
 def enter_paren(tokens):
+    ''' Code of the parentheses opened by the last token, up to the
+    matching ')' '''
+    # Enclosing parentheses still being built
+    outer = []
     line = "("
     while tokens:
-        token = tokens.pop(0)
+        token = tokens.pop()
         if token == "(":
-            # remove function names
-            if " " in line:
-                last_token = line.split()[-1]
-                if hasalpha_re.search(last_token):
-                    line = line.replace(last_token, "")
-            tokens, pline = enter_paren(tokens)
-            line += pline
+            outer.append(remove_function_name(line))
+            line = "("
         elif token == ")":
-            return tokens, line.strip() + token
+            line = line.strip() + token
+            if not outer:
+                return line
+            line = outer.pop() + line
         else:
             line += token + " "
         if ("(" in token or ")" in token) and len(token) > 1:
-            print(f"Failed to separate parentheses in tokenization: {token}")
-            sys.exit(-1)
-    return tokens, line
+            raise ValueError(
+                f"Failed to separate parentheses in tokenization: {token}")
+    while outer:
+        line = outer.pop() + line
+    return line
 
 
-def enter_keyword(tokens, openword="begin", closeword="end"):
-    line = ""
-    lines = []
-    if tokens[0] == ':':
+def open_keyword(tokens, context):
+    ''' Block for the code after a begin '''
+    if tokens.peek() == ':':
         # Drop label
-        tokens = tokens[2:]
-    while tokens:
-        token = tokens.pop(0)
-        if openword == token:
-            lines.append(StrLine(line, token.linenum))
-            line = ''
-            if VERBOSE:
-                print(f"keyLine: {line}")
-            tokens, klines = enter_keyword(tokens, openword, closeword)
-            lines += klines
-        elif closeword == token:
-            return tokens, lines
-        else:
-            tokens, line = check_token(token, tokens, lines, line)
-        line = check_endline(token, lines, line)
-    return tokens, lines
+        tokens.skip(2)
+    return Block('body', 'end', context, "keyLine")
 
 
-def enter_if(tokens):
+def walk_tokens(tokens):
+    ''' Yield the non empty lines from the tokens, each as soon as it is
+    complete '''
+    stack = []
+    block = Block('body')
     line = ""
-    begin_end = False
-    # Find 'if' condition
-    while tokens:
-        token = tokens.pop(0)
-        if ("(" in token):
-            tokens, condition = enter_paren(tokens)
-            break
-    # Reached end of 'if' condition
-    lines = []
     while tokens:
-        token = tokens.pop(0)
-        if (token == 'begin'):
-            tokens, lines = enter_keyword(tokens, 'begin', 'end')
-            break
-        else:
-            line += token + " "
-            if (token == ';'):
-                lines = [StrLine(line, token.linenum)]
-                break
-    cond_lines = [line + f" {if_del} {condition}" for line in lines if line]
-    if tokens[0] == 'else':
-        token = tokens.pop(0)
-        condition = f"! {condition}"
-        lines = []
-        while tokens:
-            token = tokens.pop(0)
-            if (token == 'begin'):
-                tokens, lines = enter_keyword(tokens, 'begin', 'end')
-                break
+        state = block.state
+        if state == 'body':
+            token = tokens.pop()
+            if token == block.closeword:
+                block = stack.pop()
+                line = block.line
+            elif token == "(":
+                line = remove_function_name(line) + enter_paren(tokens)
+            elif token == 'if' or token == 'case' or token == 'begin':
+                if line:
+                    yield Line(line, tokens.linenum, block.context)
+                if tokens.log:
+                    tokens.log(f"{block_logs.get(token, block.log_word)}: ")
+                block.line = ""
+                stack.append(block)
+                line = ""
+                if token == 'begin':
+                    block = open_keyword(tokens, block.context)
+                else:
+                    block = Block(token, context=block.context)
             else:
                 line += token + " "
-                if (token == ';'):
-                    lines = [StrLine(line, token.linenum)]
-                    break
-        cond_lines += [line + f" {if_del} {condition}"
-                       for line in lines if line]
-    return tokens, cond_lines
-
-
-def enter_case(tokens):
-    line = ""
-    begin_end = False
-    # Find 'case' condition
-    while tokens:
-        token = tokens.pop(0)
-        if ("(" in token):
-            tokens, condition = enter_paren(tokens)
-            break
-    # Reached end of 'case' condition
-    lines = []
-    while tokens:
-        token = tokens.pop(0)
-        if (token == 'endcase'):
-            break
-        tokens, line = check_token(token, tokens, lines, line)
-        line = check_endline(token, lines, line)
-    cond_lines = [line + f" {case_del} {condition}" for line in lines if line]
-    return tokens, cond_lines
+                if token in endline_words:
+                    yield Line(line, tokens.linenum, block.context)
+                    if tokens.log:
+                        tokens.log(f"endLine: {line}")
+                    line = ""
+        elif state == 'if' or state == 'case':
+            # Find the condition
+            token = tokens.pop()
+            if "(" in token:
+                condition = enter_paren(tokens)
+                if state == 'if':
+                    block.state = 'then'
+                    block.context = Condition(if_del, condition,
+                                              block.context)
+                else:
+                    block.state = 'body'
+                    block.closeword = 'endcase'
+                    block.context = Condition(case_del, condition,
+                                              block.context)
+        elif state == 'then' or state == 'else':
+            # The branch is a begin block or code up to a ';'. Code before
+            # either is kept, an else branch adds to the if branch's code
+            token = tokens.pop()
+            if token == 'begin':
+                block.state = 'after' if state == 'then' else 'done'
+                block.line = line
+                stack.append(block)
+                block = open_keyword(tokens, block.context)
+                line = ""
+            else:
+                line += token + " "
+                if token == ';':
+                    yield Line(line, tokens.linenum, block.context)
+                    block.state = 'after' if state == 'then' else 'done'
+        elif state == 'after' and tokens.peek() == 'else':
+            tokens.pop()
+            context = block.context
+            block.context = Condition(if_del, f"! {context.condition}",
+                                      context.parent)
+            block.state = 'else'
+        else:
+            # Finished if
+            block = stack.pop()
+            line = block.line
 
 
-def file_to_lines(file_contents):
-    ''' Parse file_contents into individual formalized lines of verilog '''
+def legacy_strip(file_contents):
+    ''' Reference comment and macro removal, one full pass per comment
+    kind, block comment and macro. strip_code gives the same result '''
     # Remove comments to avoid false positives
     code = comment_line_re.sub('', file_contents)
     # Preserve line number
@@ -199,45 +289,251 @@ def file_to_lines(file_contents):
         cnt = cblock.count("\n")
         code = code.replace(cblock, "\n" * cnt)
     # Remove macros, as they can be anything
-    code = code.replace('\\\n', '__killed_macro__')
+    code = code.replace('\\\n', killed_macro)
     mblocks = macro_re.findall(code)
     for mblock in mblocks:
-        mcnt = mblock.count('__killed_macro__')
+        mcnt = mblock.count(killed_macro)
         code = code.replace(mblock, "\n" * mcnt)
-    # Ensure spaces around key symbols and words for easy token regex
-    for kw in ['(', ')', ';', ':']:
-        code = code.replace(kw, f' {kw} ')
-    for kw in ['begin', 'end', 'if', 'else', 'case', 'endcase', 'for',
-               'endgenerate', 'endfunction']:
-        # Only match if it's a standalone word
-        code = re.sub(rf'(?<!\w){kw}(?!\w)', f' {kw} ', code)
-    for kw in ['<=', '=']:
-        # Only match if it's a standalone operator
-        code = re.sub(rf'(?<![<=>!]){kw}(?![<=>])', f' {kw} ', code)
-    # fix ::
-    code = code.replace(' :  : ', '::')
+    return code
+
+
+def block_end(code, start):
+    ''' End of the block comment opening at start, None if it is never
+    closed. Line comments are removed before block comments, so a // in the
+    block hides the rest of its line, including any */ '''
+    pos = start + 2
+    while True:
+        match = block_scan_re.search(code, pos)
+        if match is None:
+            return None
+        if match.group() == '*/' and code[match.end():match.end()+1] != '/':
+            return match.end()
+        pos = code.find('\n', match.start())
+        if pos < 0:
+            return None
+
+
+def contains_other(text, texts, lengths, marker):
+    ''' True if some other string of texts occurs in text, at a position
+    holding marker (where every string of texts starts) '''
+    pos = text.find(marker)
+    while pos >= 0:
+        for length in lengths:
+            if length > len(text) - pos:
+                break
+            piece = text[pos:pos+length]
+            if piece != text and piece in texts:
+                return True
+        pos = text.find(marker, pos + 1)
+    return False
+
+
+def strip_code(file_contents, history=None, final=True):
+    ''' Remove comments and macros in one scan, keeping line numbers.
+
+    The result matches legacy_strip, which replaces every occurrence of
+    each comment and macro text in turn, so one macro can also cut into a
+    longer macro line (`ifdef A into `ifdef AB). Macro lines holding another
+    macro text replay those replacements. The rarer cases of nested block
+    comments or a backslash just before a comment fall back to legacy_strip.
+
+    When streaming a file in segments, history is a dict holding the macro
+    texts of the earlier segments in order, and is updated. Replays then
+    only see macros up to the end of this segment. Unless final, None is
+    returned if the text ends inside a block comment. '''
+    code = file_contents
+    out = []
+    blocks = set()
+    macros = []
+    unclosed = False
+    fallback = False
+    pos = 0
+    while True:
+        match = strip_start_re.search(code, pos)
+        if match is None:
+            out.append(code[pos:])
+            break
+        start = match.start()
+        out.append(code[pos:start])
+        kind = match.group()
+        if kind == '\\\n':
+            # Line continuation outside of a macro
+            out.append(killed_macro)
+            pos = match.end()
+            continue
+        if kind != '`' and code[start-1:start] == '\\':
+            # Removing the comment would make a new line continuation
+            fallback = True
+        if kind == '//':
+            pos = code.find('\n', start)
+            if pos < 0:
+                pos = len(code)
+        elif kind == '/*':
+            end = None if unclosed else block_end(code, start)
+            if end is None:
+                if not final:
+                    return None
+                # Never closed, so it is kept as code
+                unclosed = True
+                out.append(kind)
+                pos = match.end()
+                continue
+            block = comment_line_re.sub('', code[start:end])
+            blocks.add(block)
+            out.append('\n' * block.count('\n'))
+            pos = end
+        else:
+            pieces = []
+            piece_start = start
+            pos = match.end()
+            while True:
+                match = macro_scan_re.search(code, pos)
+                end = len(code) if match is None else match.start()
+                kind = None if match is None else match.group()
+                if kind == '\n' and code[end-1] == '\\' \
+                        and end - 1 >= piece_start:
+                    # Continued on the next line
+                    pos = match.end()
+                    continue
+                if kind == '/*':
+                    if code[end-1:end] == '\\':
+                        fallback = True
+                    block = None if unclosed else block_end(code, end)
+                    if block is None:
+                        if not final:
+                            return None
+                        unclosed = True
+                        pos = match.end()
+                        continue
+                    text = code[end:block]
+                    if '\n' not in text:
+                        # A one line comment doesn't end the macro
+                        blocks.add(text)
+                        pieces.append(code[piece_start:end])
+                        piece_start = pos = block
+                        continue
+                pieces.append(code[piece_start:end])
+                break
+            macro = ''.join(pieces).replace('\\\n', killed_macro)
+            macros.append((len(out), macro))
+            out.append('\n' * macro.count(killed_macro))
+            pos = end
+
+    if history is None:
+        replays = [macro for _, macro in macros]
+    else:
+        history.update(dict.fromkeys(macro for _, macro in macros))
+        replays = history
+    if fallback:
+        return legacy_strip(file_contents)
+    lengths = sorted({len(block) for block in blocks})
+    for block in blocks:
+        if contains_other(block, blocks, lengths, '/*'):
+            return legacy_strip(file_contents)
+    if macros:
+        texts = set(replays)
+        lengths = sorted({len(macro) for macro in texts})
+    for index, macro in macros:
+        if contains_other(macro, texts, lengths, '`'):
+            # Replay every macro replacement, in order, on this line
+            for other in replays:
+                macro = macro.replace(other,
+                                      '\n' * other.count(killed_macro))
+            out[index] = macro
+    return ''.join(out)
+
+
+def space_code(code):
+    ''' Space out key symbols and words in one substitution, so stripped
+    code splits into tokens on whitespace '''
+    return spacing_re.sub(
+        lambda match: match.group() if match.group() == '::'
+        else f' {match.group()} ', code)
+
+
+def preprocess(file_contents):
+    ''' Strip comments and macros, then space out tokens '''
+    return space_code(strip_code(file_contents))
+
+
+def iter_tokens(fileobj, chunk_size=1 << 16, stats=None):
+    ''' (linenum, tokens) for each line of code read from fileobj that has
+    tokens. The file is read in chunks and preprocessed one segment of
+    whole lines at a time, a segment never ends inside a block comment or
+    a continued line.
+    stats is an optional object whose add(stage, seconds, calls) is given
+    the time spent in the 'strip', 'space' and 'tokenize' stages '''
+    history = {}
+    linenum = 0
+    buffer = ''
+    size = chunk_size
+    eof = False
+    while not eof:
+        chunk = fileobj.read(size)
+        eof = not chunk
+        buffer += chunk
+        start = time.perf_counter()
+        if eof:
+            code = strip_code(buffer, history)
+        else:
+            cut = buffer.rfind('\n') + 1
+            while cut and buffer.endswith('\\\n', 0, cut):
+                cut = buffer.rfind('\n', 0, cut - 1) + 1
+            code = strip_code(buffer[:cut], history, final=False) if cut \
+                else None
+            if code is None:
+                # Wait for more of the file, reading more each time so
+                # rescanning a long comment stays linear
+                size *= 2
+                continue
+            buffer = buffer[cut:]
+            size = chunk_size
+        if stats:
+            stripped = time.perf_counter()
+            stats.add('strip', stripped - start)
+        code = space_code(code)
+        if stats:
+            spaced = time.perf_counter()
+            stats.add('space', spaced - stripped)
+        token_lines = []
+        for line in code.splitlines():
+            linenum += 1
+            tokens = tokenizer.findall(line)
+            if tokens:
+                token_lines.append((linenum, tokens))
+        if stats:
+            stats.add('tokenize', time.perf_counter() - spaced,
+                      len(token_lines))
+        yield from token_lines
+
+
+def file_to_lines(file_contents, log=None):
+    ''' Parse file_contents into individual formalized lines of verilog.
+    Verbose parse messages are passed to log, if given '''
+    code = preprocess(file_contents)
 
     # Break code up into tokens, walk through tokens and build up lines of code
-    tokens = tokenizer.findall(code)
     lines = code.splitlines()
     tokens = []
     for linenum in range(len(lines)):
         new = tokenizer.findall(lines[linenum])
-        for token in new:
-            tokens.append(StrLine(token, linenum + 1))
-    lines = []
-    line = ""
-    while tokens:
-        token = tokens.pop(0)
-        tokens, line = check_token(token, tokens, lines, line)
-        line = check_endline(token, lines, line)
-    return [line for line in lines if line]
+        if new:
+            tokens.append((linenum + 1, new))
+    tokens = TokenStream(tokens, log)
+    return list(walk_tokens(tokens))
+
+
+def iter_lines(fileobj, log=None, chunk_size=1 << 16, stats=None):
+    ''' Parse the code read from fileobj, yielding the same lines as
+    file_to_lines as soon as each one is complete. Memory use follows the
+    chunk size and nesting depth rather than the file size.
+    stats is passed on to iter_tokens '''
+    tokens = TokenStream(iter_tokens(fileobj, chunk_size, stats), log)
+    yield from walk_tokens(tokens)
 
 
 if __name__ == '__main__':
     ''' Pass filename in as argument and get raw strings out '''
     with open(sys.argv[1]) as fh:
-        file_contents = fh.read()
-    lines = file_to_lines(file_contents)
-    for line in lines:
-        print("*" + line)
+        for line in iter_lines(fh):
+            print("*" + str(line))
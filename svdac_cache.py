@@ -0,0 +1,112 @@
+#! /usr/bin/env python3
+"""Persistent result cache for the Domain Assignment Checker
+
+Results are stored as one JSON file per key in a cache directory. The key
+is a hash of everything a result depends on, so an entry never has to be
+invalidated, only evicted. Eviction is least recently used: a hit bumps
+the file's mtime, and when the directory grows past its size bound the
+oldest entries are removed.
+"""
+import os
+import json
+import hashlib
+import tempfile
+
+
+def make_key(*parts):
+    ''' Hash the given str or bytes parts into a cache key '''
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8', 'surrogatepass')
+        # Length prefix keeps ('ab', 'c') and ('a', 'bc') apart
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    ''' Size bounded, least recently used store of JSON results.
+
+    directory: where entries are kept, created if missing
+    max_bytes: total entry size to keep, older entries are evicted
+
+    hits and misses count lookups made through this instance.
+    '''
+    suffix = '.json'
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _entries(self):
+        ''' (mtime, path, size) for every entry in the directory '''
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Evicted by another process
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key):
+        ''' Return the stored data for key, or None '''
+        path = self._path(key)
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            # Mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        ''' Store data, JSON serializable, under key '''
+        text = json.dumps(data, separators=(',', ':'))
+        # Write then rename, so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(text)
+        path = self._path(key)
+        try:
+            # Replacing an entry only grows the cache by the difference
+            self.size -= os.stat(path).st_size
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+        self.size += len(text)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        ''' Remove least recently used entries until under the size bound.
+        Trims to 90% of the bound so eviction doesn't run on every put '''
+        entries = sorted(self._entries())
+        self.size = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for _, path, size in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
@@ -0,0 +1,125 @@
+#! /usr/bin/env python3
+"""Client of a running 'svdac.py --serve'
+
+Checks files, or an editor buffer given on stdin, through the server and
+prints the same report and returns the same exit status as svdac.py. Only
+the standard library is imported, so a check costs little more than the
+server's own work. Without a server the files are checked in process.
+
+Usage: svdac_client.py [-1] [--max-violations N] [--max-per-file N] [-v]
+                       [-r] [--rules-file F] [--format F] [--socket PATH]
+                       [--stdin PATH] [sv_file ...]
+"""
+import os
+import sys
+import json
+import argparse
+import svdac_server
+
+
+def positive_int(text):
+    # As svdac.positive_int, svdac isn't imported unless needed
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{text} is not at least 1")
+    return value
+
+
+def create_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Check sv files through a running 'svdac.py --serve'")
+    parser.add_argument(
+        'sv_file', nargs='*', help='list of files to process')
+    parser.add_argument(
+        '-1', '--one', action='store_true',
+        help='stop at the first violation, as --max-violations 1')
+    parser.add_argument(
+        '--max-violations', type=positive_int, metavar='N',
+        help='stop checking at N violations over all files')
+    parser.add_argument(
+        '--max-per-file', type=positive_int, metavar='N',
+        help='stop checking a file at N violations')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true', help='print verbose info')
+    parser.add_argument(
+        '-r', '--rules', action='store_true', help='print rules')
+    parser.add_argument(
+        '--rules-file', help='project rules, as for svdac.py')
+    parser.add_argument(
+        '--format', choices=['text', 'jsonl'], default='text',
+        help='output format, as for svdac.py (default text)')
+    parser.add_argument(
+        '--stdin', metavar='PATH',
+        help='also check the code on stdin, an unsaved buffer of PATH')
+    parser.add_argument(
+        '--socket', default=svdac_server.default_socket_path(),
+        help='socket of the server (default as svdac.py --serve)')
+    parser.add_argument(
+        '--no-fallback', action='store_true',
+        help='fail when no server is running, instead of checking in '
+             'process')
+    return parser
+
+
+def print_response(response, args):
+    ''' Print the check response as svdac.py would, return its status '''
+    if not response['ok']:
+        print(response['error'])
+        return -2
+    for result in response['results']:
+        if 'error' in result:
+            if args.format == 'jsonl':
+                print(json.dumps({'type': 'error',
+                                  'message': result['error']}))
+            else:
+                print(result['error'])
+            return -2
+        if args.format == 'jsonl':
+            for record in result['violations']:
+                print(json.dumps({'type': 'violation', **record}))
+        else:
+            sys.stdout.write(result['text'])
+    summary = {'passes': response['passes'],
+               'violations': response['violations']}
+    if response['stopped']:
+        summary['stopped'] = True
+    if args.format == 'jsonl':
+        print(json.dumps({'type': 'summary', **summary}))
+    else:
+        stopped = (", stopped at the violation limit" if response['stopped']
+                   else "")
+        print(f"Correct checks: {response['passes']}, "
+              f"Rule violations: {response['violations']}{stopped}")
+    return response['violations']
+
+
+def main(argv):
+    parser = create_arg_parser()
+    args = parser.parse_args(argv[1:])
+    if not args.sv_file and not args.stdin:
+        parser.error("no sv files given")
+    request = {'op': 'check', 'files': args.sv_file, 'buffers': [],
+               'cwd': os.getcwd(), 'verbose': args.verbose, 'one': args.one,
+               'max_violations': args.max_violations,
+               'max_per_file': args.max_per_file,
+               'rules': args.rules, 'rules_file': args.rules_file,
+               'color': 'color' in os.environ.get('TERM', '')}
+    if args.stdin:
+        request['buffers'].append({'path': args.stdin,
+                                   'text': sys.stdin.read()})
+    try:
+        response = svdac_server.request(args.socket, request)
+    except OSError as err:
+        if isinstance(err, PermissionError):
+            # Another user's socket, the code is never sent to it
+            print(err, file=sys.stderr)
+        if args.no_fallback:
+            print(f"no svdac server listening on {args.socket}")
+            return -2
+        import svdac
+        response = svdac.CheckService().handle(request)
+    return print_response(response, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,1994 @@
+"""Checker behind svdac.py
+
+The rules, the parser driven checks, the output writers and the command
+line. svdac.py is a small script importing this module: python compiles
+a script run as __main__ on every start, while this module is loaded from
+its cached bytecode. svdac.py re-exports it, so 'import svdac' keeps
+working for library use.
+"""
+import io
+import os
+import re
+import sys
+import time
+import copy
+import bisect
+import functools
+import itertools
+import argparse
+from dataclasses import dataclass, field, asdict
+import svdac_stats
+import simple_verilog_parser
+# The pool, the cache, large file ingestion, the design index, the server,
+# numpy and json are imported where they are first needed, so --help and
+# runs served from the cache don't pay for them
+
+__version__ = "1.2.2"
+
+assert sys.version_info > (3, 7), "Requires python 3.7+ for dataclass"
+
+
+@dataclass
+class DACrule:
+    '''Documents a SV rule to be checked.
+
+    left: string to match on left hand of assignment
+    right: string to match on right hand of assignment
+    assign: string to match as the assignment operator, '=' or '<=' typically
+    ignore: if this string exists on the line, ignore violations of the rule
+    exclude: set internally to avoid collisions when subset names occur
+    '''
+    left: str
+    right: list
+    assign: str = "<="
+    ignore: str = "noDAC"
+    exclude: list = None
+
+    def __eq__(self, other):
+        return (self.left == other.left) and (self.assign == other.assign)
+
+    def __str__(self):
+        return f"{self.left} {self.assign} {self.right}"
+
+
+@dataclass
+class Violation:
+    '''A right hand variable that broke a rule.
+
+    rule: the DACrule that was violated
+    variable: the offending right hand variable
+    line: the formalized line of code, including any if/case conditions
+    linenum: line number in the file, from the parser
+    conditions: (kind, condition) of the if/case blocks the line is in,
+                innermost first, kind is 'if' or 'case'
+    passes: passes of the file counted before this violation, the passes
+            of a check stopped at it
+    logpos: position of the violation in its FileResult's log
+    '''
+    rule: DACrule
+    variable: str
+    line: str
+    linenum: int
+    conditions: list = field(default_factory=list)
+    passes: int = field(default=0, compare=False)
+    logpos: int = field(default=None, compare=False, repr=False)
+
+
+@dataclass
+class FileResult:
+    '''Result of checking one file.
+
+    filepath: checked file, None for text not read from a file
+    rules: the DACrules the file was checked against
+    passes: number of right hand variables that met their rule
+    violations: Violation instances, in the order found
+    log: verbose messages and violations, in the order they happened
+    stopped: set when checking stopped early, at the violation limit
+    cached: set when the result came from the result cache
+    stats: svdac_stats.FileStats when the Checker collects them
+    '''
+    filepath: str = None
+    rules: list = field(default_factory=list)
+    passes: int = 0
+    violations: list = field(default_factory=list)
+    log: list = field(default_factory=list)
+    stopped: bool = False
+    cached: bool = False
+    stats: svdac_stats.FileStats = None
+
+
+def result_to_dict(result):
+    ''' JSON serializable form of a FileResult, without its filepath '''
+    # By identity, equal violations of a repeated variable are distinct
+    index = {id(violation): i
+             for i, violation in enumerate(result.violations)}
+    log = []
+    for entry in result.log:
+        if isinstance(entry, Violation):
+            log.append({'violation': index[id(entry)]})
+        else:
+            log.append({'message': entry})
+    return {'rules': [asdict(rule) for rule in result.rules],
+            'passes': result.passes,
+            'violations': [{'rule': asdict(violation.rule),
+                            'variable': violation.variable,
+                            'line': violation.line,
+                            'linenum': violation.linenum,
+                            'conditions': violation.conditions,
+                            'passes': violation.passes}
+                           for violation in result.violations],
+            'log': log,
+            'stopped': result.stopped}
+
+
+def result_from_dict(data, filepath=None):
+    ''' Rebuild a FileResult from result_to_dict output '''
+    violations = [Violation(DACrule(**item['rule']), item['variable'],
+                            item['line'], item['linenum'],
+                            [tuple(pair) for pair in item['conditions']],
+                            item['passes'])
+                  for item in data['violations']]
+    log = []
+    for entry in data['log']:
+        if 'violation' in entry:
+            violation = violations[entry['violation']]
+            violation.logpos = len(log)
+            log.append(violation)
+        else:
+            log.append(entry['message'])
+    rules = [DACrule(**rule) for rule in data['rules'] or []]
+    return FileResult(filepath, rules, data['passes'], violations, log,
+                      data['stopped'])
+
+
+default_rules = []
+for letter in ['r', 's', 'd']:
+    for number in range(6):
+        default_rules.append(DACrule(f'{letter}{number+1}',
+                                     [f'{letter}{number}'],
+                                     assign='<='))
+        default_rules.append(DACrule(f'{letter}{number}',
+                                     [f'{letter}{number}'],
+                                     assign='='))
+
+# Regex for embedded rule extraction
+embed_rule_re = re.compile(r'DACrule: (.*)')
+embed_exception_re = re.compile(r'DACexception: (.*)')
+
+# Regex to identify and parse code pieces
+variable_re = re.compile(r'[\w.\[\]$:]+')
+hasalpha_re = re.compile(r'[a-zA-Z]+')
+arr_re = re.compile(r'\[.*?\]')
+word_re = re.compile(r'\w+')
+literal_words_re = re.compile(r'\w+(?: \w+)*')
+raw_range_re = re.compile(r'\d+-\d+')
+
+# Pretty colors
+ansi_colors = ('\033[91m', '\033[93m', '\033[93m'+'\033[4m', '\033[0m')
+no_colors = ('', '', '', '')
+color_names = ('RED', 'YEL', 'UYEL', 'ENDC')
+
+
+def terminal_colors():
+    ''' ansi_colors if the terminal shows colors, else no_colors '''
+    if 'TERM' in os.environ and 'color' in os.environ['TERM']:
+        return ansi_colors
+    return no_colors
+
+
+def __getattr__(name):
+    # term_colors and RED, YEL, UYEL, ENDC are looked up when first used
+    # rather than on import
+    if name == 'term_colors':
+        return terminal_colors()
+    if name in color_names:
+        return terminal_colors()[color_names.index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def normalize_words(text):
+    ''' Rewrite text for whole word matching: '_' is treated as space '''
+    return text.replace(' ', '\t').replace('_', ' ')
+
+
+def compile_word(word):
+    ''' Precompile the pattern is_word_in uses to look for word '''
+    return re.compile(rf"\b({normalize_words(word)})\b")
+
+
+def is_word_in(word, line):
+    ''' Identify if whole word (not part of other word) is in line
+    Also, treat '_' as space for matching '''
+    return True if compile_word(word).search(normalize_words(line)) else False
+
+
+class CompiledRule:
+    ''' A DACrule with its left, right and exclude patterns compiled '''
+    def __init__(self, rule):
+        self.rule = rule
+        self.full_assign = f" {rule.assign} "
+        self.left_re = compile_word(rule.left)
+        # A right that is one plain word matches a variable having it as a
+        # whole word, a set lookup. Anything else is searched for
+        self.right_words = set()
+        self.right_res = []
+        for right in rule.right:
+            right_words = normalize_words(right)
+            if word_re.fullmatch(right_words):
+                self.right_words.add(right_words)
+            else:
+                self.right_res.append(compile_word(right))
+        self.exclude_res = [compile_word(exc) for exc in rule.exclude or []]
+
+    def right_matches(self, var_words, word_set):
+        ''' True if any right of the rule is in the normalized variable,
+        whose set of words is word_set '''
+        if not self.right_words.isdisjoint(word_set):
+            return True
+        return any(right_re.search(var_words) for right_re in self.right_res)
+
+
+class CompiledRuleSet:
+    ''' Rules from process_raw_rules, compiled once and reused for every
+    line of the file, or for every file sharing the rules. Picklable, so
+    it can be sent to pool workers. dac_rules are the DACrules given '''
+    def __init__(self, rules):
+        self.dac_rules = list(rules)
+        self.rules = [CompiledRule(rule) for rule in rules]
+        # RuleTables by use_numpy
+        self.rule_tables = {}
+        # Index rule positions by assignment and by the first word of the
+        # left string. Lefts that aren't plain words are always candidates
+        self.index = {}
+        for position, rule in enumerate(self.rules):
+            by_word, unindexed = self.index.setdefault(rule.full_assign,
+                                                       ({}, []))
+            left_words = normalize_words(rule.rule.left)
+            if literal_words_re.fullmatch(left_words):
+                first_word = left_words.split(' ')[0]
+                by_word.setdefault(first_word, []).append(position)
+            else:
+                unindexed.append(position)
+
+    def candidates(self, prepared):
+        ''' Rules, in rule order, that could match the PreparedLine. A plain
+        word left can only match if its first word is a word of the left
+        hand side, so every other rule is skipped '''
+        return [self.rules[position]
+                for position in self.candidate_positions(prepared)]
+
+    def candidate_positions(self, prepared):
+        ''' Positions in rules of the candidates, in order '''
+        positions = []
+        for full_assign, (by_word, unindexed) in self.index.items():
+            side = prepared.split_assign(full_assign)
+            if side is None:
+                continue
+            positions += unindexed
+            for word in set(word_re.findall(side[0])):
+                positions += by_word.get(word, ())
+        positions.sort()
+        return positions
+
+    def table(self, use_numpy=False):
+        ''' The RuleTable of the rules, made on first use '''
+        table = self.rule_tables.get(use_numpy)
+        if table is None:
+            table = self.rule_tables[use_numpy] = RuleTable(self, use_numpy)
+        return table
+
+    def domains(self, name):
+        ''' The lefts of the rules a signal called name is on the left
+        hand side of, the domains it belongs to '''
+        words = normalize_words(name)
+        return list(dict.fromkeys(
+            rule.rule.left for rule in self.rules
+            if rule.left_re.search(words)
+            and not check_excluded_match(rule, words)))
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+
+@functools.lru_cache(maxsize=None)
+def default_ruleset():
+    ''' CompiledRuleSet of default_rules and its rules key, compiled by the
+    first Checker without rules of its own and shared by the others '''
+    ruleset = CompiledRuleSet(default_rules)
+    return ruleset, repr(ruleset.dac_rules)
+
+
+class PreparedLine:
+    ''' A parsed simple_verilog_parser.Line cleaned up and normalized once
+    for all rules '''
+    def __init__(self, line):
+        self.parsed = line
+        self.linenum = line.linenum
+        # Some hacky cleanup. Only compare against actual line of code, not
+        # 'case' or 'if' deps, but the right hand side includes them
+        base_line = fix_arrays(line.text)
+        if not line.conditions:
+            self.line = base_line
+        else:
+            self.line = fix_arrays(str(line))
+            # The space before the first delineator is part of the code
+            base_line += " "
+            if not (self.line.startswith(base_line + ":")
+                    and simple_verilog_parser.if_del not in base_line
+                    and simple_verilog_parser.case_del not in base_line):
+                # An array spans the code and its conditions
+                base_line = self.line.split(simple_verilog_parser.if_del)[0]\
+                                     .split(simple_verilog_parser.case_del)[0]
+        if "=" in base_line:
+            # Only compare up to the first '='
+            base_line = base_line[:base_line.index('=')+2]
+        self.base_line = base_line
+        self.sides = {}
+        self.right_variables = {}
+        self.excepted = None
+
+    def split_assign(self, full_assign):
+        ''' Return (normalized left hand, right hand) around full_assign, or
+        None if the line isn't that assignment. Computed once per line '''
+        if full_assign not in self.sides:
+            side = None
+            if full_assign in self.base_line:
+                split_at = self.line.index(full_assign)
+                side = (normalize_words(self.line[:split_at]),
+                        self.line[split_at + len(full_assign):])
+            self.sides[full_assign] = side
+        return self.sides[full_assign]
+
+    def conditions(self):
+        ''' (kind, condition) of the line's if/case blocks '''
+        condition_kinds = {simple_verilog_parser.if_del: 'if',
+                           simple_verilog_parser.case_del: 'case'}
+        return [(condition_kinds[delineator], condition)
+                for delineator, condition in self.parsed.conditions or ()]
+
+    def is_excepted(self, exception_re):
+        ''' True if any exception, compiled by compile_exceptions, is in the
+        line. Computed once per line for every variable and rule '''
+        if self.excepted is None:
+            self.excepted = bool(exception_re
+                                 and exception_re.search(self.line))
+        return self.excepted
+
+    def classify_right(self, full_assign):
+        ''' The variables right of full_assign, in order, as (variable,
+        normalized words, set of words, message). Constants, literals and
+        delineators are not checked, their words are None and message is
+        what verbose mode logs for them, if anything. Computed once per line
+        for all the rules '''
+        variables = self.right_variables.get(full_assign)
+        if variables is None:
+            variables = [classify_variable(variable) for variable in
+                         variable_re.findall(self.sides[full_assign][1])]
+            self.right_variables[full_assign] = variables
+        return variables
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def classify_variable(variable):
+    ''' (variable, words, set of words, message) for
+    PreparedLine.classify_right. Signal names repeat from line to line, so
+    they are classified once '''
+    if variable.isupper():
+        return variable, None, None, f"Ignored all-caps variable {variable}"
+    # Handle 1'b0 type literal
+    literals = [variable.strip(ii).isdigit() for ii in ['h', 'd', 'b', 'o']]
+    if variable.isdigit() or any(literals):
+        return variable, None, None, f"Ignored numerical variable {variable}"
+    if (not hasalpha_re.search(variable)
+            or variable == simple_verilog_parser.if_del
+            or variable == simple_verilog_parser.case_del):
+        return variable, None, None, None
+    words = normalize_words(variable)
+    return variable, words, frozenset(word_re.findall(words)), None
+
+
+def check_excluded_match(rule, lh_words):
+    ''' Determine if the compiled rule excludes the normalized lh_words '''
+    # Excluded strings are to avoid subsets: s0 shouldn't match s0_c
+    for exc_re in rule.exclude_res:
+        if exc_re.search(lh_words):
+            return True
+
+
+def fix_arrays(line):
+    ''' Extra spaces in verilog arrays makes parsing hard, so remove '''
+    arrs = arr_re.findall(line)
+    if arrs:
+        for arr in arrs:
+            line = line.replace(arr, arr.replace(" ", ""))
+    return line
+
+
+def process_line(prepared, rule, context):
+    ''' Examine the PreparedLine against the CompiledRule. Violations are
+    recorded in the CheckContext '''
+    violations = 0
+    passes = 0
+    line = prepared.line
+
+    # Check if the assignment matching this rule is in this line
+    side = prepared.split_assign(rule.full_assign)
+    if side:
+        lh_words = side[0]
+
+        # Excluded strings are to avoid subsets: s0 shouldn't match s0_c
+        if check_excluded_match(rule, lh_words):
+            return violations, passes
+
+        # Check that the left hand side matches the rule
+        if rule.left_re.search(lh_words):
+
+            # All the right hand variables, classified once per line
+            r_variables = prepared.classify_right(rule.full_assign)
+            if len(r_variables) == 0:
+                if context.verbose:
+                    context.log(f"Right hand side has no variable:\n  {line}")
+                return violations, passes
+
+            # Check that each right hand variable matches the rule
+            for variable, var_words, word_set, message in r_variables:
+                # Check all exceptions to the rule
+                if var_words is None:
+                    if message and context.verbose:
+                        context.log(message)
+                    continue
+                if prepared.is_excepted(context.exception_re):
+                    continue
+
+                # There are no exceptions for this variable, check rule
+                if not rule.right_matches(var_words, word_set):
+                    violations += 1
+                    context.add_violation(rule.rule, variable, line,
+                                          prepared.linenum,
+                                          prepared.conditions(),
+                                          context.result.passes + passes)
+                    if (context.max_violations is not None
+                            and len(context.result.violations)
+                            >= context.max_violations):
+                        # Stop at the violation limit
+                        context.result.stopped = True
+                        return violations, passes
+                else:
+                    passes += 1
+
+    return violations, passes
+
+
+# Checker engines
+engines = ['line', 'batch', 'numpy']
+
+
+def load_numpy():
+    ''' The numpy module, or None when it isn't installed '''
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class RuleTable:
+    ''' The rules of a CompiledRuleSet as a table for check_batch. The
+    plain word rights of all rules make a vocabulary, and each rule's rights
+    and each variable's words are bit masks over it: a variable meets a
+    rule when the masks share a bit, or, for rules with rights that aren't
+    plain words, when one of those is searched out.
+
+    Python ints are the masks. With use_numpy, the rights are a boolean
+    vocabulary by rules matrix instead, and a batch's (variable, rule) rows
+    are decided by looking up each of the variable's words in the rule's
+    column, all rows at once. Only the words of the rows are looked up, so
+    the work grows with the batch, not with the number of rules.
+    '''
+    # Words of this many variables and this many left hand sides are
+    # kept, then forgotten
+    max_variables = 1 << 16
+    max_lefts = 1 << 16
+
+    def __init__(self, ruleset, use_numpy=False):
+        self.rules = ruleset.rules
+        self.assigns = list(ruleset.index)
+        self.vocabulary = {}
+        for rule in self.rules:
+            for word in sorted(rule.right_words):
+                self.vocabulary.setdefault(word, len(self.vocabulary))
+        self.rule_masks = [sum(1 << self.vocabulary[word]
+                               for word in rule.right_words)
+                           for rule in self.rules]
+        self.numpy = load_numpy() if use_numpy else None
+        if use_numpy and self.numpy is None:
+            raise ImportError("use_numpy needs numpy installed")
+        self.right_matrix = None
+        if self.numpy is not None:
+            self.right_matrix = self.numpy.zeros(
+                (len(self.vocabulary), len(self.rules)), bool)
+            for position, rule in enumerate(self.rules):
+                for word in rule.right_words:
+                    self.right_matrix[self.vocabulary[word], position] = True
+        # Set of words of a variable to its (mask, vocabulary columns)
+        self.variables = {}
+        # Left hand sides repeat, the candidate rules and the rules applying
+        # to each are worked out once
+        self.lefts = {}
+
+    def __getstate__(self):
+        # Sent to pool workers with the ruleset, they learn their own words
+        state = self.__dict__.copy()
+        state['variables'] = {}
+        state['lefts'] = {}
+        state['numpy'] = self.numpy is not None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.numpy = load_numpy() if state['numpy'] else None
+
+    def words(self, word_set):
+        ''' (mask, vocabulary columns) of a variable's set of words '''
+        entry = self.variables.get(word_set)
+        if entry is None:
+            columns = sorted(self.vocabulary[word] for word in word_set
+                             if word in self.vocabulary)
+            entry = (sum(1 << column for column in columns), columns)
+            if len(self.variables) >= self.max_variables:
+                self.variables.clear()
+            self.variables[word_set] = entry
+        return entry
+
+    def failing(self, word_sets, row_variables, row_rules):
+        ''' Indexes of the rows whose variable, by its position in
+        word_sets, shares no plain word right with the rule at its
+        position. Rights that aren't plain words are left to the caller '''
+        entries = [self.words(word_set) for word_set in word_sets]
+        if self.numpy is None or not row_rules:
+            masks = [mask for mask, _ in entries]
+            rule_masks = self.rule_masks
+            return [row for row, (variable, position)
+                    in enumerate(zip(row_variables, row_rules))
+                    if not masks[variable] & rule_masks[position]]
+        numpy = self.numpy
+        # The vocabulary columns of all variables, one after the other
+        lengths = numpy.array([len(columns) for _, columns in entries],
+                              numpy.intp)
+        starts = numpy.cumsum(lengths) - lengths
+        columns = numpy.fromiter(
+            itertools.chain.from_iterable(columns for _, columns in entries),
+            numpy.intp, int(lengths.sum()))
+        # One pair per row and word of its variable
+        row_variables = numpy.array(row_variables, numpy.intp)
+        row_rules = numpy.array(row_rules, numpy.intp)
+        row_lengths = lengths[row_variables]
+        pair_rows = numpy.repeat(numpy.arange(len(row_rules)), row_lengths)
+        row_starts = numpy.cumsum(row_lengths) - row_lengths
+        within = (numpy.arange(len(pair_rows))
+                  - numpy.repeat(row_starts, row_lengths))
+        pair_columns = columns[numpy.repeat(starts[row_variables],
+                                            row_lengths) + within]
+        hits = self.right_matrix[pair_columns, row_rules[pair_rows]]
+        met = numpy.zeros(len(row_rules), bool)
+        met[pair_rows[hits]] = True
+        return numpy.flatnonzero(~met).tolist()
+
+
+def check_batch(lines, context, table, evaluations=None):
+    ''' Check a batch of parsed lines like process_line does for each line
+    and candidate rule, with the results in the same order. The rows to
+    decide, one per right hand variable of a line under a rule that applies
+    to its left hand side, are gathered first and decided together by the
+    RuleTable. Violations are made only for the rows that fail. Verbose
+    messages are not logged, see Checker. evaluations counts the candidate
+    rules of each line, like Checker._check_line does '''
+    rules = table.rules
+    result = context.result
+    prepared_lines = []
+    lefts = table.lefts
+    variable_ids = {}
+    variables = []
+    row_lines = []
+    row_variables = []
+    row_rules = []
+    for line in lines:
+        text = str(line)
+        if not any(full_assign in text for full_assign in table.assigns):
+            # Not an assignment of any rule, none is a candidate
+            continue
+        prepared = PreparedLine(line)
+        sides = [prepared.split_assign(full_assign)
+                 for full_assign in table.assigns]
+        key = tuple(side and side[0] for side in sides)
+        entry = lefts.get(key)
+        if entry is None:
+            candidates = context.ruleset.candidate_positions(prepared)
+            applying = []
+            for position in candidates:
+                rule = rules[position]
+                lh_words = prepared.split_assign(rule.full_assign)[0]
+                if (not check_excluded_match(rule, lh_words)
+                        and rule.left_re.search(lh_words)):
+                    applying.append(position)
+            entry = (candidates, applying)
+            if len(lefts) >= table.max_lefts:
+                lefts.clear()
+            lefts[key] = entry
+        candidates, applying = entry
+        if evaluations is not None:
+            for position in candidates:
+                rule = rules[position]
+                evaluations[rule] = evaluations.get(rule, 0) + 1
+        if not applying:
+            continue
+        line_index = len(prepared_lines)
+        prepared_lines.append(prepared)
+        if prepared.is_excepted(context.exception_re):
+            continue
+        # The checked variables right of each assignment, by id
+        line_variables = {}
+        for position in applying:
+            full_assign = rules[position].full_assign
+            ids = line_variables.get(full_assign)
+            if ids is None:
+                ids = line_variables[full_assign] = []
+                for variable, words, word_set, _ in prepared.classify_right(
+                        full_assign):
+                    if words is None:
+                        continue
+                    variable_id = variable_ids.get(variable)
+                    if variable_id is None:
+                        variable_id = variable_ids[variable] = len(variables)
+                        variables.append((variable, words, word_set))
+                    ids.append(variable_id)
+            row_lines += [line_index] * len(ids)
+            row_variables += ids
+            row_rules += [position] * len(ids)
+
+    failing = table.failing([word_set for _, _, word_set in variables],
+                            row_variables, row_rules)
+    # Rights that aren't plain words can still pass a failing row
+    searched = {}
+    fails = []
+    for row in failing:
+        rule = rules[row_rules[row]]
+        if rule.right_res:
+            pair = (row_variables[row], row_rules[row])
+            met = searched.get(pair)
+            if met is None:
+                words = variables[row_variables[row]][1]
+                met = searched[pair] = any(right_re.search(words)
+                                           for right_re in rule.right_res)
+            if met:
+                continue
+        fails.append(row)
+
+    end = len(row_rules)
+    if context.max_violations is not None:
+        remaining = context.max_violations - len(result.violations)
+        if len(fails) >= remaining:
+            # Stop at the violation limit, at the row of the last one
+            fails = fails[:remaining]
+            end = fails[-1] + 1
+            result.stopped = True
+    # Rows before a failing one that didn't fail are passes
+    passes = result.passes
+    result.passes += end - len(fails)
+    for failed, row in enumerate(fails):
+        prepared = prepared_lines[row_lines[row]]
+        context.add_violation(rules[row_rules[row]].rule,
+                              variables[row_variables[row]][0],
+                              prepared.line, prepared.linenum,
+                              prepared.conditions(), passes + row - failed)
+
+
+def extract_raw_range(raw):
+    ''' Given raw string of embedded rules like 's0-1, p0-1', extrapolate
+    each instance, like [s0, s1, p0, p1]. Return the array and stride size '''
+    result = []
+    for subraw in raw.split(","):
+        # Each sub element can have its own range, like s0-3
+        rawrange = raw_range_re.findall(subraw)
+        if rawrange:
+            bottom = int(rawrange[0].split("-")[0])
+            top = int(rawrange[0].split("-")[1])
+            stride = top - bottom + 1
+            for ii in range(bottom, top+1):
+                result.append(raw_range_re.sub(str(ii), subraw.strip()))
+        else:
+            # No range, just use it directly
+            result.append(subraw.strip())
+            stride = 1
+    return result, stride
+
+
+def find_superstrings(words):
+    ''' For each of the distinct words, the indexes of the other words
+    containing it, in order. Every suffix of every word is kept sorted, so
+    the words containing a word are found by binary search '''
+    suffixes = sorted((word[start:], index)
+                      for index, word in enumerate(words)
+                      for start in range(len(word)))
+    keys = [suffix for suffix, _ in suffixes]
+    result = []
+    for index, word in enumerate(words):
+        found = set()
+        pos = bisect.bisect_left(keys, word)
+        while pos < len(keys) and keys[pos].startswith(word):
+            found.add(suffixes[pos][1])
+            pos += 1
+        found.discard(index)
+        result.append(sorted(found))
+    return result
+
+
+def process_raw_rules(raw_rules, base_rules=None):
+    ''' Translate raw embedded rules to DACrule instances:
+    'n3_c = s3, p3, e3, n3_c, [3] -- OKcomb'
+    becomes
+    DACrule(left='n3_c', right=['s3', 'p3', 'e3', 'n3_c', '[3]'],
+            assign='=', ignore='OKcomb', exclude=None)
+
+    The raw rules are layered over base_rules if given, like a rules file,
+    and otherwise replace the default rules.
+    '''
+    if len(raw_rules) == 0:
+        return default_rules if base_rules is None else base_rules
+    # Keyed like DACrule equality, a later rule overrides in place
+    rules = {}
+    for rule in base_rules or []:
+        # Exclusions are worked out again below
+        rules[(rule.left, rule.assign)] = DACrule(rule.left, rule.right,
+                                                  rule.assign, rule.ignore)
+
+    for raw in raw_rules:
+        # raw example: s0-3, p0-3, e0-3 = s0-3, p0-3, e0-3, [0-3] -- OKcomb
+        if "<=" in raw:
+            assign = "<="
+        else:
+            assign = "="
+        lh, rem = raw.split(assign)
+        if '--' in rem:
+            rh, ignore = rem.split('--')
+            ignore = ignore.strip()
+        else:
+            # No ignore option, use default
+            rh = rem
+            ignore = default_rules[0].ignore
+
+        left_arr, lhstride = extract_raw_range(lh)
+        right_arr, rhstride = extract_raw_range(rh)
+
+        if lhstride != rhstride:
+            # In order to generate ranges, the strides must match
+            raise ValueError(
+                "Embedded rules do not have matching number ranges")
+
+        for ii in range(len(left_arr)):
+            new_rule = DACrule(left_arr[ii],
+                               right_arr[ii % lhstride::rhstride],
+                               assign, ignore)
+            # Override with later rules if existing already
+            rules[(new_rule.left, new_rule.assign)] = new_rule
+    rules = list(rules.values())
+
+    # If there are subsets on left-hand strings, false matches will occur
+    for assign in dict.fromkeys(rule.assign for rule in rules):
+        group = [rule for rule in rules if rule.assign == assign]
+        lefts = [rule.left for rule in group]
+        for rule, supersets in zip(group, find_superstrings(lefts)):
+            if supersets:
+                # This is a subset, and will match unless excluded
+                rule.exclude = [lefts[ii] for ii in supersets]
+    return rules
+
+
+def load_rules_file(filepath):
+    ''' DACrules of a project rules file, which holds 'DACrule:' lines in
+    the same format as embedded rules '''
+    with open(filepath) as fh:
+        raw_rules = embed_rule_re.findall(fh.read())
+    if not raw_rules:
+        raise ValueError(f"No 'DACrule:' lines in rules file {filepath}")
+    return process_raw_rules(raw_rules)
+
+
+def remove_ignored_lines(file_contents, rule):
+    ''' Replace lines marked with rule.ignore with blank lines '''
+    lines = file_contents.splitlines()
+    result = []
+    for line in lines:
+        if rule.ignore in line:
+            # Add \n to preserve line number count
+            result.append("\n")
+        else:
+            result.append(line)
+        # Special rule for ignoring variables but keep end of line ;
+        if f"{rule.ignore};" in line:
+            result.append(';')
+    return "\n".join(result)
+
+
+def remove_all_ignored_lines(file_contents, rules):
+    ''' Same as remove_ignored_lines for every rule in turn, in one scan.
+
+    A line is replaced by the first ignore in rules order it holds, only
+    trailing blank lines can differ. Ignores of '' or ';' would match the
+    lines left by earlier ignores, so then each rule is applied in turn. '''
+    ignores = list(dict.fromkeys(rule.ignore for rule in rules))
+    if any(ignore in ('', ';') for ignore in ignores):
+        for rule in rules:
+            file_contents = remove_ignored_lines(file_contents, rule)
+        return file_contents
+
+    # Normalize line breaks like splitlines, then find pragmas in one go
+    code = "\n".join(file_contents.splitlines())
+    if len(ignores) == 1:
+        ignore_re = re.compile(re.escape(ignores[0]))
+    else:
+        ignore_re = re.compile("|".join(map(re.escape, ignores)))
+    result = []
+    pos = 0
+    for match in ignore_re.finditer(code):
+        if match.start() < pos:
+            # Line already replaced
+            continue
+        start = code.rfind("\n", 0, match.start()) + 1
+        end = code.find("\n", match.end())
+        if end < 0:
+            end = len(code)
+        line = code[start:end]
+        ignore = next(ignore for ignore in ignores if ignore in line)
+        result.append(code[pos:start])
+        # Add \n to preserve line number count
+        result.append("\n")
+        # Special rule for ignoring variables but keep end of line ;
+        if f"{ignore};" in line:
+            result.append("\n;")
+        pos = end
+    result.append(code[pos:])
+    return "".join(result)
+
+
+def split_exceptions(raw_exceptions):
+    ''' Exceptions of a file from what its DACexception pragmas list,
+    they only apply to this file '''
+    if not raw_exceptions:
+        return []
+    raw = ",".join(raw_exceptions)
+    return [exc.strip() for exc in raw.split(",") if exc]
+
+
+def compile_exceptions(exceptions):
+    ''' One pattern searching a line for any of the exception strings at
+    once, or None when there are none. Empty strings never except a line '''
+    exceptions = sorted({exc for exc in exceptions if exc}, key=len,
+                        reverse=True)
+    if not exceptions:
+        return None
+    return re.compile("|".join(map(re.escape, exceptions)))
+
+
+class CheckContext:
+    ''' Everything needed to check one file: compiled rules, exceptions,
+    options, and the FileResult being filled in. A context is never
+    shared, so files can be checked concurrently '''
+    def __init__(self, result, ruleset, exceptions, verbose=False,
+                 max_violations=None):
+        self.result = result
+        self.ruleset = ruleset
+        self.exceptions = exceptions
+        self.exception_re = compile_exceptions(exceptions)
+        self.verbose = verbose
+        self.max_violations = max_violations
+
+    def for_result(self, result):
+        ''' A context with the same rules, exceptions and options, filling
+        in another FileResult '''
+        context = copy.copy(self)
+        context.result = result
+        return context
+
+    def log(self, message):
+        ''' Record a verbose message '''
+        self.result.log.append(message)
+
+    def add_violation(self, rule, variable, line, linenum, conditions,
+                      passes):
+        ''' Record a violation, passes being those counted before it '''
+        violation = Violation(rule, variable, line, linenum, conditions,
+                              passes, len(self.result.log))
+        self.result.violations.append(violation)
+        self.result.log.append(violation)
+
+
+class LineMemo:
+    ''' Results of checking formalized lines, by line text, kept between
+    checks of a file as it is edited. Lines whose text didn't change are
+    not checked again. Results only hold for the rules, exceptions and
+    options they were made with, any change of those drops them.
+
+    reused and checked count the lines of the last check.
+    '''
+    def __init__(self):
+        self.key = None
+        self.lines = {}
+        self.used = {}
+        self.reused = 0
+        self.checked = 0
+
+    def start(self, key):
+        ''' Begin checking the file again, with rules etc. given by key '''
+        if key != self.key:
+            self.key = key
+            self.lines = {}
+        self.used = {}
+        self.reused = 0
+        self.checked = 0
+
+    def finish(self):
+        ''' Keep only the results of lines still in the file '''
+        self.lines = self.used
+        self.used = {}
+
+
+class Checker:
+    ''' Check sv code against its embedded (or the default) rules.
+
+    verbose: record verbose messages in FileResult.log
+    one: stop checking a file at its first violation, as max_per_file=1
+    max_per_file: stop checking a file at this many violations, the result
+                  is marked stopped. None to check whole files
+    cache: optional svdac_cache.ResultCache, files whose contents, rules,
+           exceptions and options were checked before are not rechecked
+    rules: optional DACrules, from a rules file, used instead of the
+           default rules. Rules embedded in a file are layered on top
+    stats: collect per stage timings and rule evaluation counts in
+           FileResult.stats
+    mmap_size: files of this many bytes or more are checked with
+               check_mapped, when there is no cache. None to never do so
+    ruleset_cache: keep the compiled rules of this many files with their
+                   own rules, for files checked again and again
+    engine: 'line' checks a line at a time with process_line, 'batch'
+            batch_size lines at a time with check_batch, 'numpy' the same
+            with numpy deciding the rows. Verbose checks and checks with a
+            LineMemo always go a line at a time
+
+    The shared rules are compiled once. A Checker holds no per-file state,
+    so one instance can check any number of files, also from several
+    threads at once, and it can be pickled for worker processes.
+    '''
+    parse_stages = ['strip', 'space', 'tokenize']
+
+    def __init__(self, verbose=False, one=False, cache=None, rules=None,
+                 stats=False, mmap_size=None, ruleset_cache=0,
+                 max_per_file=None, engine='line', batch_size=1024):
+        if engine not in engines:
+            raise ValueError(f"unknown engine {engine}")
+        if engine == 'numpy' and load_numpy() is None:
+            raise ValueError("the numpy engine needs numpy installed")
+        self.verbose = verbose
+        self.max_per_file = 1 if one else max_per_file
+        self.cache = cache
+        self.rules = rules
+        self.stats = stats
+        self.mmap_size = mmap_size
+        self.ruleset_cache = ruleset_cache
+        self.engine = engine
+        self.batch_size = batch_size
+        self.rulesets = {}
+        if rules is None:
+            self.ruleset, self.rules_key = default_ruleset()
+        else:
+            self.ruleset = CompiledRuleSet(rules)
+            self.rules_key = repr(self.ruleset.dac_rules)
+
+    def check_file(self, filepath, memo=None):
+        ''' Check the sv file at filepath, return a FileResult '''
+        if (self.mmap_size is not None and memo is None
+                and self.cache is None
+                and os.path.getsize(filepath) >= self.mmap_size):
+            return self.check_mapped(filepath)
+        start = time.perf_counter()
+        with open(filepath) as fh:
+            file_contents = fh.read()
+        read = time.perf_counter() - start
+        result = self.check_text(file_contents, filepath, memo)
+        if result.stats:
+            result.stats.add('read', read)
+            result.stats.seconds += read
+        return result
+
+    def check_text(self, file_contents, filepath=None, memo=None):
+        ''' Check sv code given as a string, return a FileResult.
+        memo is an optional LineMemo kept for this file between calls '''
+        return self._with_stats(self._check_text, file_contents, filepath,
+                                memo)
+
+    def check_mapped(self, filepath):
+        ''' Check the sv file at filepath without reading it into memory,
+        return a FileResult. The file is memory mapped, scanned for pragmas
+        and parsed a block at a time. Results are not cached '''
+        return self._with_stats(self._check_mapped, filepath)
+
+    def _with_stats(self, check, *args):
+        ''' check(*args, stats), with stats collected if enabled '''
+        if not self.stats:
+            return check(*args, None)
+        stats = svdac_stats.FileStats()
+        start = time.perf_counter()
+        result = check(*args, stats)
+        stats.seconds = time.perf_counter() - start
+        result.stats = stats
+        return result
+
+    def _file_rules(self, raw_rules, stats):
+        ''' (rules, ruleset) for a file with the embedded raw_rules. The
+        shared ruleset is used if there are none, else ruleset is None '''
+        if not raw_rules:
+            return self.ruleset.dac_rules, self.ruleset
+        with svdac_stats.timer(stats, 'rules'):
+            return process_raw_rules(raw_rules, self.rules), None
+
+    def _check_text(self, file_contents, filepath, memo, stats):
+        # Extract rules from sv, without any the shared rules are used
+        rules, ruleset = self._file_rules(
+            embed_rule_re.findall(file_contents), stats)
+        if self.cache is None:
+            return self._check(file_contents, filepath, rules, ruleset, memo,
+                               stats)
+
+        import svdac_cache
+        with svdac_stats.timer(stats, 'cache'):
+            key = svdac_cache.make_key(
+                __version__,
+                self.rules_key if ruleset else repr(rules),
+                repr(embed_exception_re.findall(file_contents)),
+                repr((self.verbose, self.max_per_file)), file_contents)
+            data = self.cache.get(key)
+        if data is not None:
+            result = result_from_dict(data, filepath)
+            if ruleset:
+                result.rules = rules
+            result.cached = True
+            return result
+        result = self._check(file_contents, filepath, rules, ruleset, memo,
+                             stats)
+        with svdac_stats.timer(stats, 'cache'):
+            data = result_to_dict(result)
+            if ruleset:
+                # Shared rules are part of the key, no need to store them
+                data['rules'] = None
+            self.cache.put(key, data)
+        return result
+
+    def _check_mapped(self, filepath, stats):
+        import svdac_ingest
+        with svdac_ingest.MappedFile(filepath) as mapped:
+            with svdac_stats.timer(stats, 'pragmas'):
+                # Text mode reads would turn '\r' into a line break too
+                raw_rules = []
+                for line in mapped.marked_lines(b"DACrule: ", (b"\n", b"\r")):
+                    raw_rules += embed_rule_re.findall(line)
+            rules, ruleset = self._file_rules(raw_rules, stats)
+
+            def remove_ignored(text):
+                return remove_all_ignored_lines(text, rules)
+
+            with svdac_stats.timer(stats, 'pragmas'):
+                # Exceptions on ignored lines don't count
+                raw_exceptions = []
+                for line in mapped.marked_lines(b"DACexception: "):
+                    raw_exceptions += embed_exception_re.findall(
+                        remove_ignored(line))
+            return self._check_lines(
+                mapped.reader(remove_ignored), filepath, rules,
+                split_exceptions(raw_exceptions), ruleset, None, stats)
+
+    def _check(self, file_contents, filepath, rules, ruleset=None,
+               memo=None, stats=None):
+        with svdac_stats.timer(stats, 'pragmas'):
+            file_contents = remove_all_ignored_lines(file_contents, rules)
+            exceptions = split_exceptions(
+                embed_exception_re.findall(file_contents))
+        return self._check_lines(io.StringIO(file_contents), filepath, rules,
+                                 exceptions, ruleset, memo, stats)
+
+    def _check_lines(self, fileobj, filepath, rules, exceptions, ruleset,
+                     memo, stats):
+        ''' Parse and check the code read from fileobj, ignored lines
+        already removed '''
+        result = FileResult(filepath, rules)
+        if ruleset is None:
+            with svdac_stats.timer(stats, 'rules'):
+                ruleset = self.compile_rules(rules)
+        context = CheckContext(result, ruleset, exceptions, self.verbose,
+                               self.max_per_file)
+        table = None
+        if memo is None and self.engine != 'line' and not self.verbose:
+            use_numpy = self.engine == 'numpy'
+            table = ruleset.rule_tables.get(use_numpy)
+            if table is None:
+                with svdac_stats.timer(stats, 'rules'):
+                    table = ruleset.table(use_numpy)
+        start = time.perf_counter()
+        lines = simple_verilog_parser.iter_lines(
+            fileobj, context.log if self.verbose else None, stats=stats)
+        if self.verbose:
+            # Keep the parse messages ahead of the check messages
+            lines = list(lines)
+
+        if memo is None:
+            if table is not None:
+                self._check_batched(lines, context, table, stats, start)
+                return result
+            if stats:
+                self._check_timed(lines, context, stats, start)
+                return result
+            for line in lines:
+                self._check_line(line, context)
+                if result.stopped:
+                    break
+            return result
+
+        rules_key = self.rules_key if ruleset is self.ruleset else repr(rules)
+        memo.start((rules_key, exceptions, self.verbose))
+        for line in lines:
+            self._check_memo_line(line, context, memo)
+            if result.stopped:
+                break
+        memo.finish()
+        return result
+
+    def _check_timed(self, lines, context, stats, start):
+        ''' Check the lines, adding the time spent parsing and checking
+        since start to stats, and how often each rule was evaluated '''
+        parsed = stats.stage_seconds(self.parse_stages)
+        evaluations = {}
+        checking = 0.0
+        count = 0
+        for line in lines:
+            line_start = time.perf_counter()
+            self._check_line(line, context, evaluations)
+            checking += time.perf_counter() - line_start
+            count += 1
+            if context.result.stopped:
+                break
+        self._add_check_stats(stats, start, parsed, checking, count,
+                              evaluations)
+
+    def _check_batched(self, lines, context, table, stats, start):
+        ''' Check the lines batch_size at a time with check_batch against
+        the RuleTable. With stats, add the time spent like _check_timed
+        does '''
+        evaluations = None
+        if stats:
+            parsed = stats.stage_seconds(self.parse_stages)
+            evaluations = {}
+        checking = 0.0
+        count = 0
+        lines = iter(lines)
+        while not context.result.stopped:
+            batch = list(itertools.islice(lines, self.batch_size))
+            if not batch:
+                break
+            batch_start = time.perf_counter()
+            check_batch(batch, context, table, evaluations)
+            checking += time.perf_counter() - batch_start
+            count += len(batch)
+        if stats:
+            self._add_check_stats(stats, start, parsed, checking, count,
+                                  evaluations)
+
+    def _add_check_stats(self, stats, start, parsed, checking, count,
+                         evaluations):
+        ''' Add the walk and check times of count lines to stats, parsed
+        being the parse stage seconds when checking started '''
+        # The walk is whatever parsing time the other stages don't account
+        walking = (time.perf_counter() - start - checking
+                   - (stats.stage_seconds(self.parse_stages) - parsed))
+        stats.add('walk', walking, count)
+        stats.add('check', checking, count)
+        for rule, evaluated in evaluations.items():
+            text = str(rule.rule)
+            stats.rules[text] = stats.rules.get(text, 0) + evaluated
+
+    def compile_rules(self, rules):
+        ''' CompiledRuleSet of a file's own rules, reused from the last
+        ruleset_cache compiled. Not thread safe when caching '''
+        if not self.ruleset_cache:
+            return CompiledRuleSet(rules)
+        key = repr(rules)
+        # Reinserted on every use, so the oldest is the least recently used
+        ruleset = self.rulesets.pop(key, None)
+        if ruleset is None:
+            ruleset = CompiledRuleSet(rules)
+            if len(self.rulesets) >= self.ruleset_cache:
+                del self.rulesets[next(iter(self.rulesets))]
+        self.rulesets[key] = ruleset
+        return ruleset
+
+    @property
+    def design_key(self):
+        ''' Key of svdac_design.DesignIndex entries made by design_entry '''
+        return f"{__version__} {self.rules_key}"
+
+    def design_entry(self, file_contents):
+        ''' The svdac_design.DesignIndex entry of a file: its modules and
+        instances, the domains of the ports by the file's rules, and the
+        embedded rules and exceptions to check its instances with '''
+        import svdac_design
+        raw_rules = embed_rule_re.findall(file_contents)
+        rules, ruleset = self._file_rules(raw_rules, None)
+        file_contents = remove_all_ignored_lines(file_contents, rules)
+        entry = svdac_design.scan_design(file_contents)
+        if ruleset is None:
+            ruleset = CompiledRuleSet(rules)
+        for module in entry['modules'].values():
+            for port in module['ports']:
+                port['domains'] = ruleset.domains(port['name'])
+        entry['rules'] = raw_rules
+        entry['exceptions'] = split_exceptions(
+            embed_exception_re.findall(file_contents))
+        return entry
+
+    def check_design(self, index):
+        ''' Check the port connections of every instance in the
+        svdac_design.DesignIndex, return a FileResult for each file making
+        instances. A connection is checked as an assignment, 'port = signal'
+        for an input and 'signal = port' for an output, by the rules of the
+        file making the instance '''
+        import svdac_design
+        modules = index.modules()
+        results = []
+        for entry in index.files.values():
+            if not entry['instances']:
+                continue
+            rules, ruleset = self._file_rules(entry['rules'], None)
+            if ruleset is None:
+                ruleset = CompiledRuleSet(rules)
+            # Rules are reported with the file's own result
+            result = FileResult(entry['path'], [])
+            results.append(result)
+            context = CheckContext(result, ruleset, entry['exceptions'],
+                                   self.verbose, self.max_per_file)
+            for instance in entry['instances']:
+                module = modules.get(instance['module'])
+                if module is None:
+                    continue
+                for port, expr, linenum in svdac_design.connections(
+                        instance, module):
+                    self._check_connection(instance, port, expr, linenum,
+                                           context)
+                    if result.stopped:
+                        break
+                if result.stopped:
+                    break
+        return results
+
+    def _check_connection(self, instance, port, expr, linenum, context):
+        name = port['name']
+        texts = []
+        if port['direction'] in ('input', 'inout'):
+            texts.append(f"{name} = {expr} ;")
+        if port['direction'] in ('output', 'inout'):
+            texts.append(f"{expr} = {name} ;")
+        violations = context.result.violations
+        for text in texts:
+            start = len(violations)
+            self._check_line(simple_verilog_parser.Line(text, linenum),
+                             context)
+            for violation in violations[start:]:
+                domains = ", ".join(port['domains']) or "none"
+                violation.line = (f"{instance['module']} {instance['name']}"
+                                  f" .{name}({expr}), {port['direction']} "
+                                  f"port of domain {domains}: {text}")
+            if context.result.stopped:
+                return
+
+    def _check_line(self, line, context, evaluations=None):
+        prepared = PreparedLine(line)
+        for rule in context.ruleset.candidates(prepared):
+            if evaluations is not None:
+                evaluations[rule] = evaluations.get(rule, 0) + 1
+            erred, passed = process_line(prepared, rule, context)
+            context.result.passes += passed
+            if context.result.stopped:
+                return
+
+    def _check_memo_line(self, line, context, memo):
+        ''' Check the line into the memo unless its text was checked before,
+        then add its results to the context '''
+        result = context.result
+        remaining = None
+        if context.max_violations is not None:
+            remaining = context.max_violations - len(result.violations)
+        # The text length tells the code from its conditions
+        key = (len(line.text), str(line))
+        entry = memo.lines.get(key) or memo.used.get(key)
+        if entry is not None:
+            count, stopped = entry[2], entry[3]
+            # Reuse only results the violation limit cuts the same way
+            if remaining is None:
+                if stopped:
+                    entry = None
+            elif count > remaining or (count == remaining) != stopped:
+                entry = None
+        if entry is None:
+            scratch = FileResult()
+            scratch_context = context.for_result(scratch)
+            scratch_context.max_violations = remaining
+            self._check_line(line, scratch_context)
+            entry = (scratch.passes, scratch.log, len(scratch.violations),
+                     scratch.stopped)
+            memo.checked += 1
+        else:
+            memo.reused += 1
+        memo.used[key] = entry
+        passes, log, count, stopped = entry
+        # Passes of the entry's violations count from the start of the line
+        start = result.passes
+        result.passes += passes
+        for logged in log:
+            if isinstance(logged, Violation):
+                logged = Violation(logged.rule, logged.variable, logged.line,
+                                   line.linenum, logged.conditions,
+                                   start + logged.passes,
+                                   len(result.log))
+                result.violations.append(logged)
+            result.log.append(logged)
+        result.stopped = stopped
+
+
+def format_violation(violation, colors=None):
+    ''' Text report of a Violation, with the variable highlighted. colors
+    are (RED, YEL, UYEL, ENDC), by default as the terminal allows '''
+    red, yel, uyel, endc = colors or terminal_colors()
+    line = violation.line
+    variable = violation.variable
+    return (f"{red}Rule {violation.rule} "
+            f"violation ({yel}{variable}{red}):{endc}\n"
+            f"\t(near line {violation.linenum})\n"
+            f"\t{line.replace(variable,uyel+variable+endc)}")
+
+
+def print_result(result, args, file=None, colors=None):
+    ''' Print a FileResult as the command line reports it '''
+    if args.rules:
+        for rule in result.rules:
+            print(repr(rule), file=file)
+    for entry in result.log:
+        if isinstance(entry, Violation):
+            print(format_violation(entry, colors), file=file)
+        else:
+            print(entry, file=file)
+
+
+def violation_record(violation, filepath):
+    ''' JSON serializable record of a Violation found in filepath '''
+    rule = violation.rule
+    return {'file': filepath,
+            'line': violation.linenum,
+            'rule': {'left': rule.left, 'right': rule.right,
+                     'assign': rule.assign, 'ignore': rule.ignore},
+            'variable': violation.variable,
+            'code': violation.line,
+            'conditions': [{'kind': kind, 'condition': condition}
+                           for kind, condition in violation.conditions]}
+
+
+class TextWriter:
+    ''' The colored text report, with verbose messages and rules as
+    requested. Summary is a dict of counts, None when checking failed '''
+    def __init__(self, out, args):
+        self.out = out
+        self.args = args
+
+    def write_result(self, result):
+        print_result(result, self.args, self.out)
+
+    def write_error(self, message):
+        print(message, file=self.out)
+
+    def close(self, summary):
+        if summary is None:
+            return
+        text = (f"Correct checks: {summary['passes']}, "
+                f"Rule violations: {summary['violations']}")
+        if 'cache_hits' in summary:
+            text += (f", Cache hits: {summary['cache_hits']}, "
+                     f"misses: {summary['cache_misses']}")
+        if summary.get('stopped'):
+            text += ", stopped at the violation limit"
+        print(text, file=self.out)
+
+
+class SummaryWriter(TextWriter):
+    ''' Only the number of violations of each file that has any, then the
+    summary. No violation is formatted, for runs with many of them '''
+    def write_result(self, result):
+        if result.violations:
+            stopped = ", stopped at the limit" if result.stopped else ""
+            print(f"{result.filepath}: {len(result.violations)} rule "
+                  f"violations{stopped}", file=self.out)
+
+
+class CountWriter(TextWriter):
+    ''' Only the total number of violations '''
+    def write_result(self, result):
+        pass
+
+    def close(self, summary):
+        if summary is not None:
+            print(summary['violations'], file=self.out)
+
+
+class JsonlWriter(TextWriter):
+    ''' One JSON object per line: a 'violation' record per violation, as
+    each file's result comes in, then an 'error' or 'summary' record '''
+    def __init__(self, out, args):
+        super().__init__(out, args)
+        import json
+        self.dumps = json.dumps
+
+    def write_record(self, record):
+        self.out.write(self.dumps(record) + "\n")
+
+    def write_result(self, result):
+        for violation in result.violations:
+            record = violation_record(violation, result.filepath)
+            self.write_record({'type': 'violation', **record})
+
+    def write_error(self, message):
+        self.write_record({'type': 'error', 'message': message})
+
+    def close(self, summary):
+        if summary is not None:
+            self.write_record({'type': 'summary', **summary})
+
+
+class SarifWriter(TextWriter):
+    ''' A SARIF 2.1.0 log with one run. Results are written as each file's
+    result comes in, the tool and its rules once all are known '''
+    schema = "https://json.schemastore.org/sarif-2.1.0.json"
+
+    def __init__(self, out, args):
+        super().__init__(out, args)
+        import json
+        self.dumps = json.dumps
+        self.rules = {}
+        self.notifications = []
+        self.out.write(f'{{"version": "2.1.0", "$schema": "{self.schema}", '
+                       '"runs": [{"results": [')
+        self.separator = "\n"
+
+    def write_result(self, result):
+        for violation in result.violations:
+            record = violation_record(violation, result.filepath)
+            rule = violation.rule
+            rule_id = f"{rule.left} {rule.assign}"
+            self.rules.setdefault(rule_id, str(rule))
+            sarif = {
+                'ruleId': rule_id,
+                'level': 'error',
+                'message': {'text': f"Rule {rule} violation "
+                                    f"({violation.variable})"},
+                'locations': [{'physicalLocation': {
+                    'artifactLocation': {
+                        'uri': (result.filepath or '').replace(os.sep, '/')},
+                    'region': {'startLine': violation.linenum}}}],
+                'properties': {key: record[key] for key in
+                               ['variable', 'code', 'conditions']}}
+            self.out.write(self.separator + self.dumps(sarif))
+            self.separator = ",\n"
+
+    def write_error(self, message):
+        self.notifications.append({'level': 'error',
+                                   'message': {'text': message}})
+
+    def close(self, summary):
+        driver = {'name': 'svdac', 'version': __version__,
+                  'rules': [{'id': rule_id,
+                             'shortDescription': {'text': text}}
+                            for rule_id, text in self.rules.items()]}
+        invocation = {'executionSuccessful': not self.notifications,
+                      'toolExecutionNotifications': self.notifications}
+        tail = {'tool': {'driver': driver}, 'invocations': [invocation]}
+        if summary is not None:
+            tail['properties'] = summary
+        self.out.write("\n], " + self.dumps(tail)[1:] + "]}\n")
+
+
+writers = {'text': TextWriter, 'jsonl': JsonlWriter, 'sarif': SarifWriter,
+           'summary': SummaryWriter, 'count': CountWriter}
+
+
+def violation_limits(one, max_violations, max_per_file):
+    ''' The overall and per file violation limits of the options, None for
+    no limit. -1 is a limit of one violation overall, and no file needs
+    checking past the overall limit. Raises ValueError for a limit below
+    one '''
+    if one:
+        max_violations = 1
+    limits = [limit for limit in (max_violations, max_per_file)
+              if limit is not None]
+    for limit in limits:
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError(f"violation limits must be at least 1, not "
+                             f"{limit!r}")
+    return max_violations, min(limits) if limits else None
+
+
+def truncate_result(result, count):
+    ''' Cut the FileResult down to its first count violations, count > 0,
+    with the log up to the last of them, and mark it stopped. The passes
+    are those counted before the last of them, as if checking had stopped
+    there '''
+    if len(result.violations) <= count:
+        return
+    result.violations = result.violations[:count]
+    last = result.violations[-1]
+    result.passes = last.passes
+    end = last.logpos
+    if end is None or end >= len(result.log) or result.log[end] is not last:
+        # Not recorded where it is, the count-th violation logged ends it
+        end = len(result.log) - 1
+        seen = 0
+        for pos, entry in enumerate(result.log):
+            if isinstance(entry, Violation):
+                seen += 1
+                if seen == count:
+                    end = pos
+                    break
+    result.log = result.log[:end + 1]
+    result.stopped = True
+
+
+class CheckService:
+    ''' Answers the check requests of svdac_server clients, keeping
+    checkers with their compiled rules, and the results of the files
+    checked, between requests. An unchanged file's result is returned as
+    is, a changed file only has its changed lines checked. Both are
+    bounded, least recently used ones are dropped. A check request is:
+
+    {"op": "check", "files": [paths], "buffers": [{"path", "text"}],
+     "cwd": dir relative paths are in, "verbose", "one", "max_violations",
+     "max_per_file", "rules", "rules_file", "color"}
+
+    The options are those of the command line, color highlights the text
+    report. Files are checked, then buffers, and the response is:
+
+    {"ok": true, "passes", "violations", "stopped", "results": [{"file",
+     "passes", "violations": [violation_record], "stopped", "text"}]}
+
+    where text is the report the command line prints, and stopped is set
+    when the violation limit ended the check. A file that can't be checked
+    ends the results with {"file", "error"}.
+    '''
+    def __init__(self, max_files=256, max_checkers=8):
+        self.max_files = max_files
+        self.max_checkers = max_checkers
+        self.checkers = {}
+        # (checker key, path) to [LineMemo, signature, FileResult]
+        self.files = {}
+        self.requests = 0
+        self.started = time.time()
+        # Checkers and memos aren't thread safe, check one request at a time
+        import threading
+        self.lock = threading.Lock()
+
+    def handle(self, request):
+        with self.lock:
+            self.requests += 1
+            if request.get('op') == 'check':
+                return self.check(request)
+            if request.get('op') == 'stats':
+                return {'ok': True, 'requests': self.requests,
+                        'checkers': len(self.checkers),
+                        'files': len(self.files),
+                        'uptime': time.time() - self.started}
+            return {'ok': False, 'error': f"unknown op {request.get('op')}"}
+
+    def checker(self, request):
+        ''' The Checker for the options of the request, and its key '''
+        rules_file = request.get('rules_file')
+        if rules_file:
+            rules_file = os.path.join(request.get('cwd', ''), rules_file)
+            # A changed rules file makes a new checker
+            rules_file = (rules_file, os.stat(rules_file).st_mtime_ns)
+        max_per_file = violation_limits(request.get('one'),
+                                        request.get('max_violations'),
+                                        request.get('max_per_file'))[1]
+        key = (bool(request.get('verbose')), max_per_file, rules_file)
+        checker = self.checkers.pop(key, None)
+        if checker is None:
+            rules = load_rules_file(rules_file[0]) if rules_file else None
+            checker = Checker(verbose=key[0], rules=rules,
+                              ruleset_cache=self.max_files,
+                              max_per_file=max_per_file)
+            if len(self.checkers) >= self.max_checkers:
+                del self.checkers[next(iter(self.checkers))]
+        self.checkers[key] = checker
+        return checker, key
+
+    def file_entry(self, key):
+        entry = self.files.pop(key, None)
+        if entry is None:
+            entry = [LineMemo(), None, None]
+            if len(self.files) >= self.max_files:
+                del self.files[next(iter(self.files))]
+        self.files[key] = entry
+        return entry
+
+    def check_one(self, checker, key, fullpath, text):
+        ''' FileResult of the file at fullpath, or of its buffer text '''
+        import svdac_cache
+        entry = self.file_entry((key, fullpath))
+        if text is None:
+            stat = os.stat(fullpath)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        else:
+            signature = svdac_cache.make_key(text)
+        if entry[1] != signature:
+            if text is None:
+                entry[2] = checker.check_file(fullpath, entry[0])
+            else:
+                entry[2] = checker.check_text(text, fullpath, entry[0])
+            entry[1] = signature
+        return entry[2]
+
+    def check(self, request):
+        try:
+            checker, key = self.checker(request)
+        except (OSError, ValueError) as err:
+            return {'ok': False, 'error': str(err)}
+        cwd = request.get('cwd', '')
+        limit = violation_limits(request.get('one'),
+                                 request.get('max_violations'), None)[0]
+        args = argparse.Namespace(rules=bool(request.get('rules')))
+        colors = ansi_colors if request.get('color') else no_colors
+        response = {'ok': True, 'passes': 0, 'violations': 0,
+                    'stopped': False, 'results': []}
+        jobs = [(filepath, None) for filepath in request.get('files', [])]
+        jobs += [(buffer['path'], buffer['text'])
+                 for buffer in request.get('buffers', [])]
+        for filepath, text in jobs:
+            fullpath = os.path.abspath(os.path.join(cwd, filepath))
+            try:
+                result = self.check_one(checker, key, fullpath, text)
+            except (OSError, ValueError) as err:
+                response['results'].append({'file': filepath,
+                                            'error': str(err)})
+                break
+            if (limit is not None
+                    and response['violations'] + len(result.violations)
+                    >= limit):
+                # Kept whole for the next request, which may allow more
+                result = copy.copy(result)
+                truncate_result(result, limit - response['violations'])
+                response['stopped'] = True
+            report = io.StringIO()
+            print_result(result, args, report, colors)
+            response['results'].append({
+                'file': filepath, 'passes': result.passes,
+                'violations': [violation_record(violation, filepath)
+                               for violation in result.violations],
+                'stopped': result.stopped, 'text': report.getvalue()})
+            response['passes'] += result.passes
+            response['violations'] += len(result.violations)
+            if response['stopped']:
+                break
+        return response
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{text} is not at least 1")
+    return value
+
+
+def create_arg_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'sv_file', nargs='*',
+        help='list of files to process, @LIST reads them from a file list')
+    parser.add_argument(
+        '-f', '--filelist', action='append', default=[], metavar='LIST',
+        help='also process the files listed in LIST, one or more per line, '
+             'as EDA tools take them')
+    parser.add_argument(
+        '-1', '--one', action='store_true',
+        help='stop at the first violation, as --max-violations 1')
+    parser.add_argument(
+        '--max-violations', type=positive_int, metavar='N',
+        help='stop checking at N violations over all files')
+    parser.add_argument(
+        '--max-per-file', type=positive_int, metavar='N',
+        help='stop checking a file at N violations, then go on with the '
+             'next one')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true', help='print verbose info')
+    parser.add_argument(
+        '-r', '--rules', action='store_true', help='print rules')
+    parser.add_argument(
+        '--rules-file',
+        help='project rules, DACrule lines used instead of the default '
+             'rules, rules embedded in a file override them')
+    parser.add_argument(
+        '--format', choices=list(writers), default='text',
+        help='output format: colored text, JSON lines with a record per '
+             'violation, a SARIF log, only the number of violations per '
+             'file, or only their total count (default text)')
+    parser.add_argument(
+        '--engine', choices=engines, default='line',
+        help='check lines one at a time, or a batch at a time against a '
+             'table of the rules, deciding it in Python or with numpy '
+             '(default line)')
+    parser.add_argument(
+        '--stats', action='store_true',
+        help='report time and calls per checking stage, the slowest files '
+             'with their own stage split, and the most evaluated rules on '
+             'stderr')
+    parser.add_argument(
+        '--stats-top', type=int, default=10, metavar='N',
+        help='number of files and rules listed by --stats (default 10)')
+    parser.add_argument(
+        '--profile', metavar='OUT',
+        help='write a cProfile dump of the run to OUT, with -j the '
+             'workers are not included')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='check files in N parallel processes (0: one per CPU)')
+    parser.add_argument(
+        '--watch', action='store_true',
+        help='keep running, recheck files whenever they change')
+    parser.add_argument(
+        '--interval', type=float, default=0.5,
+        help='seconds between checks for changes in watch mode '
+             '(default 0.5)')
+    parser.add_argument(
+        '--serve', nargs='?', const='',
+        metavar='SOCKET',
+        help='keep running, answering svdac_client.py requests on the Unix '
+             'socket SOCKET (default in $XDG_RUNTIME_DIR or the temp dir)')
+    parser.add_argument(
+        '--serve-files', type=int, default=256, metavar='N',
+        help='files whose results --serve keeps for reuse (default 256)')
+    parser.add_argument(
+        '--design-index', metavar='INDEX',
+        help='also check instance port connections across the files, '
+             'keeping the index of their modules and instances in INDEX')
+    parser.add_argument(
+        '--mmap-size', type=int, default=64, metavar='MB',
+        help='memory map files of MB or more and parse them a block at a '
+             'time, when not caching (default 64)')
+    parser.add_argument(
+        '--cache-dir', help='reuse results of unchanged files from this dir')
+    parser.add_argument(
+        '--cache-size', type=int, default=256,
+        help='cache size limit in MB, least recently used entries are '
+             'evicted (default 256)')
+    return parser
+
+
+# Checker of a pool worker process, sent once when the worker starts
+worker_checker = None
+
+
+def init_worker(checker):
+    global worker_checker
+    worker_checker = checker
+
+
+def check_file_in_worker(filepath):
+    return worker_checker.check_file(filepath)
+
+
+def iter_design_results(results, checker, filepaths, index_path):
+    ''' The results, then those of checking the instance port connections
+    of the design made of the files, with the index at index_path brought
+    up to date '''
+    import svdac_design
+    yield from results
+    index = svdac_design.DesignIndex(index_path, checker.design_key)
+    index.update(filepaths, checker.design_entry)
+    index.save()
+    yield from checker.check_design(index)
+
+
+def iter_results(checker, filepaths, jobs):
+    ''' Yield a FileResult per file in filepaths order, checking them in a
+    process pool when jobs > 1 '''
+    if jobs == 1 or len(filepaths) == 1:
+        for filepath in filepaths:
+            yield checker.check_file(filepath)
+        return
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker,
+            initargs=(checker,)) as pool:
+        futures = [pool.submit(check_file_in_worker, filepath)
+                   for filepath in filepaths]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            # Consumer stopped early, don't start the remaining files
+            for future in futures:
+                future.cancel()
+
+
+def watch(checker, filepaths, args):
+    ''' Check the files, then poll them and recheck each one that changes.
+    Lines whose text is unchanged reuse their results. Runs until
+    interrupted, returns the number of violations at that point '''
+    signatures = {}
+    memos = {filepath: LineMemo() for filepath in filepaths}
+    results = {}
+    try:
+        while True:
+            changed = False
+            for filepath in filepaths:
+                try:
+                    stat = os.stat(filepath)
+                except OSError:
+                    # Removed, or replaced while saving
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if signatures.get(filepath) == signature:
+                    continue
+                signatures[filepath] = signature
+                changed = True
+                memo = memos[filepath]
+                start = time.perf_counter()
+                try:
+                    result = checker.check_file(filepath, memo)
+                except (OSError, ValueError) as err:
+                    print(f"{filepath}: {err}")
+                    results.pop(filepath, None)
+                    continue
+                elapsed = time.perf_counter() - start
+                results[filepath] = result
+                print(f"--- {filepath}: checked in {elapsed * 1000:.0f} ms, "
+                      f"{memo.reused} of {memo.reused + memo.checked} "
+                      "line results reused")
+                print_result(result, args)
+            if changed:
+                passes = sum(result.passes for result in results.values())
+                errors = sum(len(result.violations)
+                             for result in results.values())
+                print(f"Correct checks: {passes}, Rule violations: {errors}")
+                sys.stdout.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return sum(len(result.violations) for result in results.values())
+
+
+def main(args):
+    parser = create_arg_parser()
+    args = parser.parse_args(args[1:])
+    if not args.profile:
+        return run(args, parser)
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(run, args, parser)
+    finally:
+        profiler.dump_stats(args.profile)
+
+
+def run(args, parser):
+    ''' Check the files as given by the parsed args, return the exit status '''
+    errors = 0
+    passes = 0
+    cache_hits = 0
+    cache = None
+    if args.cache_dir:
+        import svdac_cache
+        cache = svdac_cache.ResultCache(args.cache_dir,
+                                        args.cache_size * 1024 * 1024)
+    if args.serve is not None:
+        import svdac_server
+        socket_path = args.serve or svdac_server.default_socket_path()
+        service = CheckService(args.serve_files)
+        print(f"serving on {socket_path}", file=sys.stderr)
+        try:
+            svdac_server.serve(socket_path, service.handle)
+        except OSError as err:
+            print(err)
+            return -2
+        return 0
+    rules = None
+    if args.rules_file:
+        try:
+            rules = load_rules_file(args.rules_file)
+        except (OSError, ValueError) as err:
+            print(err)
+            return -2
+    filepaths = []
+    try:
+        if args.filelist or any(filepath.startswith('@')
+                                for filepath in args.sv_file):
+            import svdac_ingest
+        for filepath in args.sv_file:
+            if filepath.startswith('@'):
+                filepaths += svdac_ingest.read_filelist(filepath[1:])
+            else:
+                filepaths.append(filepath)
+        for filelist in args.filelist:
+            filepaths += svdac_ingest.read_filelist(filelist)
+    except (OSError, ValueError) as err:
+        print(err)
+        return -2
+    if not filepaths:
+        parser.error("no sv files given")
+    limit, max_per_file = violation_limits(args.one, args.max_violations,
+                                           args.max_per_file)
+    try:
+        # Files often share their embedded rules, the compiled rules of
+        # the last 64 are kept
+        checker = Checker(verbose=args.verbose, cache=cache, rules=rules,
+                          stats=args.stats,
+                          mmap_size=args.mmap_size * 1024 * 1024,
+                          ruleset_cache=64, max_per_file=max_per_file,
+                          engine=args.engine)
+    except ValueError as err:
+        parser.error(str(err))
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    if args.watch:
+        if args.format != 'text':
+            parser.error("--watch only supports --format text")
+        if args.design_index:
+            parser.error("--watch doesn't support --design-index")
+        return watch(checker, filepaths, args)
+
+    writer = writers[args.format](sys.stdout, args)
+    run_stats = svdac_stats.RunStats() if args.stats else None
+    status = None
+    stopped = False
+    checked = 0
+    results = iter_results(checker, filepaths, jobs)
+    if args.design_index:
+        results = iter_design_results(results, checker, filepaths,
+                                      args.design_index)
+    try:
+        for result in results:
+            if limit is not None and errors + len(result.violations) >= limit:
+                truncate_result(result, limit - errors)
+                stopped = True
+            writer.write_result(result)
+            errors += len(result.violations)
+            passes += result.passes
+            checked += 1
+            cache_hits += result.cached
+            if result.stats:
+                run_stats.add(result.filepath, result.stats)
+            if stopped:
+                # Closing results cancels the files not yet checked
+                break
+    except (OSError, ValueError) as err:
+        # A file that can't be read, or the design index, ends the report
+        writer.write_error(str(err))
+        status = -2
+    finally:
+        results.close()
+
+    summary = None
+    if status is None:
+        summary = {'passes': passes, 'violations': errors}
+        if stopped:
+            summary['stopped'] = True
+        if cache:
+            # Count from results, pool workers have their own cache instance
+            summary['cache_hits'] = cache_hits
+            summary['cache_misses'] = (min(checked, len(filepaths))
+                                       - cache_hits)
+    writer.close(summary)
+    if run_stats:
+        run_stats.report(sys.stderr, args.stats_top)
+    return errors if status is None else status
@@ -0,0 +1,349 @@
+#! /usr/bin/env python3
+"""Cross-file design index for the Domain Assignment Checker
+
+Each file is checked on its own, so a _s2 output of one module feeding a
+_s3 input in its parent is never seen. The design index records, for every
+file of the design, the modules it defines with their ports, and the
+instances it makes with their port connections. Connections can then be
+checked against the rules like assignments, whichever files the modules
+come from.
+
+The index is kept in a JSON file. Only files whose size or modification
+time changed are scanned again, so full-chip runs don't re-parse
+unchanged modules.
+
+The formalized lines of simple_verilog_parser drop the names in front of
+'(', which are exactly the port and instance names, so modules and
+instances are found by walking its preprocessed tokens instead.
+"""
+import io
+import os
+import re
+import json
+import tempfile
+import simple_verilog_parser
+
+# Tokens are split further, around punctuation the parser leaves attached
+punct_re = re.compile(r"[(),;]|[^(),;]+")
+identifier_re = re.compile(r"[A-Za-z_][\w$]*")
+directions = {'input', 'output', 'inout', 'ref'}
+# Declarations whose bodies hold no instances
+skipped_blocks = {'function': 'endfunction', 'task': 'endtask',
+                  'class': 'endclass', 'covergroup': 'endgroup',
+                  'property': 'endproperty', 'sequence': 'endsequence'}
+# Words that can't be a module or instance name
+reserved = {
+    'always', 'always_comb', 'always_ff', 'always_latch', 'assert',
+    'assign', 'assume', 'automatic', 'begin', 'bit', 'byte', 'case',
+    'casex', 'casez', 'const', 'cover', 'default', 'else', 'end', 'endcase',
+    'endgenerate', 'endmodule', 'enum', 'for', 'foreach', 'forever',
+    'generate', 'genvar', 'if', 'import', 'initial', 'inout', 'input', 'int',
+    'integer', 'localparam', 'logic', 'output', 'packed', 'parameter', 'real',
+    'reg', 'repeat', 'return', 'signed', 'static', 'string', 'struct', 'tri',
+    'typedef', 'union', 'unsigned', 'var', 'void', 'while', 'wire',
+}
+
+
+def is_name(token):
+    return bool(identifier_re.fullmatch(token)) and token not in reserved
+
+
+class TokenWalk:
+    ''' The split tokens of preprocessed code, with their line numbers '''
+    def __init__(self, code):
+        self.tokens = []
+        self.linenums = []
+        for linenum, tokens in simple_verilog_parser.iter_tokens(
+                io.StringIO(code)):
+            for token in tokens:
+                for piece in punct_re.findall(token):
+                    self.tokens.append(piece)
+                    self.linenums.append(linenum)
+
+    def get(self, pos):
+        return self.tokens[pos] if pos < len(self.tokens) else None
+
+    def close_paren(self, pos):
+        ''' Position of the ')' closing the '(' at pos, or None '''
+        depth = 0
+        for end in range(pos, len(self.tokens)):
+            token = self.tokens[end]
+            if token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+                if depth == 0:
+                    return end
+        return None
+
+    def split_list(self, pos):
+        ''' The comma separated items, as (start, end) token ranges, of the
+        parenthesized list opened at pos, and the position of its ')' '''
+        end = self.close_paren(pos)
+        if end is None:
+            return None, None
+        items = []
+        depth = 0
+        start = pos + 1
+        for item_end in range(pos + 1, end):
+            token = self.tokens[item_end]
+            if token in '([{':
+                depth += 1
+            elif token in ')]}':
+                depth -= 1
+            elif token == ',' and depth == 0:
+                items.append((start, item_end))
+                start = item_end + 1
+        items.append((start, end))
+        return items, end
+
+    def declared_name(self, start, end):
+        ''' Name declared by the tokens in start:end, the last name before
+        any '=' outside of brackets '''
+        name = None
+        brackets = 0
+        for pos in range(start, end):
+            token = self.tokens[pos]
+            if token == '=':
+                break
+            if brackets == 0 and is_name(token) and token not in directions:
+                name = token
+            brackets += token.count('[') - token.count(']')
+        return name
+
+
+def scan_design(code):
+    ''' Modules and instances in preprocessed-to-be sv code, as a JSON
+    serializable dict:
+
+    modules: name to {'line', 'ports'}, ports a list of {'name',
+             'direction'}, direction None if it wasn't found
+    instances: list of {'module', 'name', 'parent', 'line', 'wildcard',
+               'connections'}, connections a list of {'port', 'position',
+               'expr', 'line'}, port None for connections by position
+    '''
+    walk = TokenWalk(code)
+    modules = {}
+    instances = []
+    module = None
+    pos = 0
+    while pos < len(walk.tokens):
+        token = walk.tokens[pos]
+        if token in ('module', 'macromodule'):
+            module, pos = scan_module(walk, pos, modules)
+        elif token == 'endmodule':
+            module = None
+            pos += 1
+        elif token in skipped_blocks:
+            end = skipped_blocks[token]
+            while pos < len(walk.tokens) and walk.tokens[pos] != end:
+                pos += 1
+        elif module is None:
+            pos += 1
+        elif token in directions and walk.get(pos - 1) == ';':
+            pos = scan_port_declaration(walk, pos, modules[module])
+        elif is_name(token):
+            pos = scan_instances(walk, pos, module, instances)
+        else:
+            pos += 1
+    return {'modules': modules, 'instances': instances}
+
+
+def scan_module(walk, pos, modules):
+    ''' Module header at pos, return its name and the position after it '''
+    name = walk.get(pos + 1)
+    if name in ('automatic', 'static'):
+        pos += 1
+        name = walk.get(pos + 1)
+    if name is None or not is_name(name):
+        return None, pos + 1
+    module = {'line': walk.linenums[pos], 'ports': []}
+    modules[name] = module
+    pos += 2
+    while walk.get(pos) == 'import':
+        while walk.get(pos) not in (';', None):
+            pos += 1
+        pos += 1
+    if walk.get(pos) == '#' and walk.get(pos + 1) == '(':
+        pos = (walk.close_paren(pos + 1) or len(walk.tokens)) + 1
+    if walk.get(pos) == '(':
+        items, end = walk.split_list(pos)
+        if items is None:
+            return name, len(walk.tokens)
+        direction = None
+        for start, item_end in items:
+            if start == item_end:
+                continue
+            first = walk.tokens[start]
+            if first in directions:
+                direction = first
+            port = walk.declared_name(start, item_end)
+            if port:
+                module['ports'].append({'name': port,
+                                        'direction': direction})
+        pos = end + 1
+    return name, pos
+
+
+def scan_port_declaration(walk, pos, module):
+    ''' Body declaration 'input a, b;' of a module with its port directions
+    left out of the header. Return the position after it '''
+    direction = walk.tokens[pos]
+    ports = {port['name']: port for port in module['ports']
+             if port['direction'] is None}
+    start = pos + 1
+    end = start
+    while True:
+        token = walk.get(end)
+        if token in (',', ';', None):
+            name = walk.declared_name(start, end)
+            if name in ports:
+                ports[name]['direction'] = direction
+            if token != ',':
+                return end + 1
+            start = end + 1
+        end += 1
+
+
+def scan_instances(walk, pos, parent, instances):
+    ''' 'type #(params) name (connections), name2 (...);' at pos, or just
+    the next position if that isn't there '''
+    module = walk.tokens[pos]
+    after = pos + 1
+    if walk.get(after) == '#':
+        if walk.get(after + 1) == '(':
+            after = walk.close_paren(after + 1)
+            if after is None:
+                return pos + 1
+            after += 1
+        else:
+            after += 2
+    found = []
+    while True:
+        name = walk.get(after)
+        if name is None or not is_name(name):
+            return pos + 1
+        after += 1
+        # Instance arrays, like u_pipe[3:0]
+        while (walk.get(after) or '').startswith('['):
+            while not walk.tokens[after].endswith(']'):
+                after += 1
+                if after >= len(walk.tokens):
+                    return pos + 1
+            after += 1
+        if walk.get(after) != '(':
+            return pos + 1
+        items, end = walk.split_list(after)
+        if items is None:
+            return pos + 1
+        found.append(scan_connections(walk, module, name, parent,
+                                      walk.linenums[pos], items))
+        after = end + 1
+        if walk.get(after) == ';':
+            instances += found
+            return after + 1
+        if walk.get(after) != ',':
+            return pos + 1
+        after += 1
+
+
+def scan_connections(walk, module, name, parent, linenum, items):
+    instance = {'module': module, 'name': name, 'parent': parent,
+                'line': linenum, 'wildcard': False, 'connections': []}
+    for position, (start, end) in enumerate(items):
+        if start == end:
+            continue
+        first = walk.tokens[start]
+        connection = {'port': None, 'position': position, 'expr': None,
+                      'line': walk.linenums[start]}
+        if first == '.*':
+            instance['wildcard'] = True
+            continue
+        if first.startswith('.'):
+            connection['port'] = first[1:]
+            if start + 1 < end and walk.tokens[start + 1] == '(':
+                expr = walk.tokens[start + 2:end - 1]
+                connection['expr'] = " ".join(expr) if expr else None
+            else:
+                # Implicit .port, connects the signal of the same name
+                connection['expr'] = connection['port']
+        else:
+            connection['expr'] = " ".join(walk.tokens[start:end])
+        instance['connections'].append(connection)
+    return instance
+
+
+def connections(instance, module):
+    ''' (port, expr, line) for each connected port of the instance, port
+    being the {'name', 'direction'} of the instantiated module. Ports left
+    to .* connect the signal of the same name, they aren't listed '''
+    ports = {port['name']: port for port in module['ports']}
+    for connection in instance['connections']:
+        if connection['expr'] is None:
+            continue
+        if connection['port'] is None:
+            if connection['position'] >= len(module['ports']):
+                continue
+            port = module['ports'][connection['position']]
+        else:
+            port = ports.get(connection['port'])
+            if port is None:
+                continue
+        yield port, connection['expr'], connection['line']
+
+
+class DesignIndex:
+    ''' Modules and instances of every file of the design, stored as JSON
+    at path. Entries hold for one key, the checker version and rules, any
+    other key drops them '''
+    version = 1
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.files = {}
+        self.scanned = 0
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == self.version and data.get('key') == key:
+            self.files = data['files']
+
+    def update(self, filepaths, analyze):
+        ''' Bring the index up to date with the files at filepaths, which
+        make up the design. analyze(file_contents) gives the entry of a
+        file whose size or modification time changed, like scan_design does
+        with anything else to keep about the file '''
+        files = {}
+        self.scanned = 0
+        for filepath in filepaths:
+            status = os.stat(filepath)
+            stamp = [status.st_mtime_ns, status.st_size]
+            entry = self.files.get(os.path.abspath(filepath))
+            if entry is None or entry['stamp'] != stamp:
+                with open(filepath) as fh:
+                    entry = analyze(fh.read())
+                entry['stamp'] = stamp
+                self.scanned += 1
+            entry['path'] = filepath
+            files[os.path.abspath(filepath)] = entry
+        self.files = files
+
+    def save(self):
+        data = {'version': self.version, 'key': self.key,
+                'files': self.files}
+        # Write then rename, so a stopped run never leaves half an index
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(data, fh, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def modules(self):
+        ''' Module name to its entry, over all files '''
+        modules = {}
+        for entry in self.files.values():
+            modules.update(entry['modules'])
+        return modules
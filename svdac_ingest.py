@@ -0,0 +1,155 @@
+#! /usr/bin/env python3
+"""Large file ingestion for the Domain Assignment Checker
+
+Generated netlists can be hundreds of MB. Rather than reading such a file
+into one string and copying it for every preprocessing step, it is mapped
+into memory: pragmas are found by scanning the bytes, decoding only the
+lines that hold them, and the code is decoded and handed to the parser a
+block at a time.
+
+Also reads EDA style file lists, given with -f or as @filelist, so long
+lists of files don't have to fit on the command line.
+"""
+import os
+import mmap
+import codecs
+import locale
+
+
+class MappedFile:
+    ''' A file mapped read only into memory, use as a context manager.
+    data is the mapping, or b"" for an empty file. Text is decoded like
+    open() does by default '''
+    def __init__(self, filepath, encoding=None):
+        self.filepath = filepath
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.data = b""
+        self.fh = None
+        self.map = None
+
+    def __enter__(self):
+        self.fh = open(self.filepath, 'rb')
+        if os.fstat(self.fh.fileno()).st_size:
+            self.map = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = self.map
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.map is not None:
+            self.map.close()
+        self.fh.close()
+
+    def marked_lines(self, marker, ends=(b"\n",)):
+        ''' Decoded text of each line holding the bytes marker, lines are
+        ended by any of the bytes in ends '''
+        data = self.data
+        pos = data.find(marker)
+        while pos >= 0:
+            start = max(data.rfind(end, 0, pos) for end in ends) + 1
+            stop = len(data)
+            for end in ends:
+                found = data.find(end, pos)
+                if 0 <= found < stop:
+                    stop = found
+            yield data[start:stop].decode(self.encoding)
+            pos = data.find(marker, stop)
+
+    def reader(self, transform, block_size=1 << 20):
+        ''' A TextReader of the file, see there '''
+        return TextReader(self, transform, block_size)
+
+
+class TextReader:
+    ''' Reads a MappedFile as text through transform, file like enough for
+    simple_verilog_parser.iter_lines.
+
+    transform takes text of whole lines and returns it with its line breaks
+    normalized to '\\n' and no trailing line break, like
+    "\\n".join(text.splitlines()) does. It is applied to a run of lines at
+    a time, which are joined back with '\\n', so it must treat every line
+    on its own. Memory stays at a few blocks whatever the file size.
+    '''
+    def __init__(self, mapped, transform, block_size=1 << 20):
+        self.data = mapped.data
+        self.transform = transform
+        self.block_size = block_size
+        self.decoder = codecs.getincrementaldecoder(mapped.encoding)()
+        self.pos = 0
+        self.pending = ""
+        self.out = ""
+        self.first = True
+        self.done = False
+
+    def read(self, size=-1):
+        while not self.done and (size < 0 or len(self.out) < size):
+            self.fill()
+        if size < 0:
+            size = len(self.out)
+        text = self.out[:size]
+        self.out = self.out[size:]
+        return text
+
+    def fill(self):
+        ''' Decode the next block, transform its whole lines '''
+        block = self.data[self.pos:self.pos + self.block_size]
+        self.pos += len(block)
+        final = self.pos >= len(self.data)
+        self.pending += self.decoder.decode(block, final)
+        if final:
+            segment = self.pending
+            self.pending = ""
+            self.done = True
+        else:
+            # Cut after the last line break, keeping '\r\n' together
+            cut = max(self.pending.rfind("\n"),
+                      self.pending.rfind("\r", 0, len(self.pending) - 1)) + 1
+            if not cut:
+                # No whole line yet
+                return
+            segment = self.pending[:cut]
+            self.pending = self.pending[cut:]
+        if segment:
+            if not self.first:
+                self.out += "\n"
+            self.out += self.transform(segment)
+            self.first = False
+
+
+def read_filelist(filepath):
+    ''' The files listed in the file list at filepath, as EDA tools take
+    with -f. Paths are separated by white space, '//' and '#' start
+    comments, environment variables are expanded. '-f list' includes
+    another list, '-F list' one with paths relative to that list's
+    directory. Other options, like +incdir+ or the -v and -y libraries,
+    are skipped '''
+    return list(_read_filelist(filepath, None))
+
+
+def _read_filelist(filepath, base):
+    with open(filepath) as fh:
+        words = []
+        for line in fh:
+            line = line.split("//")[0].split("#")[0]
+            words += os.path.expandvars(line).split()
+    words = iter(words)
+    for word in words:
+        if word in ('-f', '-F'):
+            nested = next(words, None)
+            if nested is None:
+                raise ValueError(f"{filepath}: {word} without a file list")
+            nested = _resolve(nested, base)
+            yield from _read_filelist(
+                nested, os.path.dirname(nested) if word == '-F' else base)
+        elif word in ('-v', '-y'):
+            next(words, None)
+        elif word.startswith(('-', '+')):
+            continue
+        else:
+            yield _resolve(word, base)
+
+
+def _resolve(path, base):
+    ''' path relative to base, if there is one '''
+    if base is None or os.path.isabs(path):
+        return path
+    return os.path.join(base, path)
@@ -0,0 +1,138 @@
+#! /usr/bin/env python3
+"""Unix socket server and client protocol for the Domain Assignment Checker
+
+'svdac.py --serve' keeps a checker process running, so each check skips
+Python startup, compiling the rules and re-parsing unchanged lines.
+Requests and responses are JSON objects, one per line, and a connection
+can send any number of requests. Besides what the request handler
+answers, the server itself answers:
+
+    {"op": "ping"}      {"ok": true, "pid": <server pid>}
+    {"op": "shutdown"}  {"ok": true}, then the server exits
+
+Any other request goes to the handler given to serve. A request that
+isn't valid JSON, or that the handler fails on, gets
+{"ok": false, "error": <message>}.
+
+This module only uses the standard library, so the client (see
+svdac_client.py) starts quickly.
+"""
+import os
+import json
+import stat
+import socket
+import threading
+import socketserver
+
+
+def default_socket_path():
+    ''' Socket path of the current user's server. Without a runtime
+    directory it is in a directory of the user's own in the temp dir, where
+    other users can't put a socket of theirs '''
+    directory = os.environ.get('XDG_RUNTIME_DIR')
+    if not directory:
+        directory = os.path.join(os.environ.get('TMPDIR') or '/tmp',
+                                 f"svdac-{os.getuid()}")
+    return os.path.join(directory, f"svdac-{os.getuid()}.sock")
+
+
+def private_directory(directory):
+    ''' Create directory for the current user only, or check that it is
+    theirs and closed to others. Raises PermissionError otherwise '''
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    status = os.lstat(directory)
+    if (not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid()
+            or status.st_mode & 0o077):
+        raise PermissionError(f"{directory} is not a directory only the "
+                              "current user can access")
+
+
+def check_owner(socket_path):
+    ''' Raise PermissionError unless socket_path is a socket of the current
+    user, a server of another user could read the code sent to it and
+    answer anything '''
+    status = os.lstat(socket_path)
+    if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} is not a socket of the current "
+                              "user")
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            op = None
+            try:
+                request = json.loads(line)
+                op = request.get('op')
+                if op == 'ping':
+                    response = {'ok': True, 'pid': os.getpid()}
+                elif op == 'shutdown':
+                    response = {'ok': True}
+                else:
+                    response = self.server.handle_request_data(request)
+            except Exception as err:
+                response = {'ok': False, 'error': f"{type(err).__name__}: "
+                                                  f"{err}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+            if op == 'shutdown':
+                # shutdown() waits for serve_forever, so from a thread
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, handle):
+        self.handle_request_data = handle
+        super().__init__(socket_path, RequestHandler)
+
+
+def serve(socket_path, handle):
+    ''' Answer requests on the Unix socket at socket_path until a shutdown
+    request or Ctrl-C. handle(request) returns the response to any request
+    the server doesn't answer itself, it is called from several threads.
+    Raises OSError if another server listens there, or if socket_path is
+    something else than a socket of the current user '''
+    if socket_path == default_socket_path():
+        private_directory(os.path.dirname(socket_path))
+    if os.path.lexists(socket_path):
+        check_owner(socket_path)
+        try:
+            request(socket_path, {'op': 'ping'})
+        except OSError:
+            # Left behind by a server that didn't exit cleanly
+            os.unlink(socket_path)
+        else:
+            raise OSError(f"a server is already listening on {socket_path}")
+    # Bound under this umask, the socket is never open to other users
+    umask = os.umask(0o077)
+    try:
+        server = Server(socket_path, handle)
+    finally:
+        os.umask(umask)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+def request(socket_path, data, timeout=None):
+    ''' Send one request to the server at socket_path, return its response.
+    Raises OSError if no server of the current user is listening '''
+    check_owner(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(data).encode() + b"\n")
+        with sock.makefile('rb') as fh:
+            line = fh.readline()
+    if not line:
+        raise ConnectionError("server closed the connection")
+    return json.loads(line)
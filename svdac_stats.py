@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+"""Run statistics for the Domain Assignment Checker
+
+FileStats collects the wall time and number of calls of each checking
+stage for one file, and how many times each rule was evaluated. They
+travel with the file's result, also back from pool workers, and
+RunStats adds them up into the --stats report.
+"""
+import time
+import contextlib
+
+# Checking stages, in the order they run
+stages = ['read', 'cache', 'rules', 'pragmas', 'strip', 'space', 'tokenize',
+          'walk', 'check']
+
+
+class FileStats:
+    ''' Statistics of checking one file.
+
+    stages: stage name to [seconds, calls]
+    rules: rule text to the number of lines it was evaluated on
+    seconds: wall time for the whole file
+    '''
+    def __init__(self):
+        self.stages = {}
+        self.rules = {}
+        self.seconds = 0.0
+
+    def add(self, stage, seconds, calls=1):
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    @contextlib.contextmanager
+    def timer(self, stage, calls=1):
+        ''' Add the time spent in the with block to stage '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, calls)
+
+    def stage_seconds(self, names):
+        return sum(self.stages.get(name, (0.0, 0))[0] for name in names)
+
+
+class RunStats:
+    ''' Statistics of a whole run, added up from FileStats '''
+    def __init__(self):
+        self.total = FileStats()
+        self.files = []
+
+    def add(self, filepath, stats):
+        for stage, (seconds, calls) in stats.stages.items():
+            self.total.add(stage, seconds, calls)
+        for rule, count in stats.rules.items():
+            self.total.rules[rule] = self.total.rules.get(rule, 0) + count
+        self.total.seconds += stats.seconds
+        self.files.append((stats.seconds, filepath, stats.stages))
+
+    def report(self, out, top=10):
+        ''' Write the per stage totals, then the top slowest files with
+        their own stage split, and the most evaluated rules '''
+        total = self.total
+        print(f"Stage timings over {len(self.files)} files, "
+              f"{total.seconds:.3f} s:", file=out)
+        print(f"  {'stage':<10} {'seconds':>9} {'share':>6} {'calls':>10}",
+              file=out)
+        for stage in stages:
+            if stage not in total.stages:
+                continue
+            seconds, calls = total.stages[stage]
+            share = seconds / total.seconds if total.seconds else 0.0
+            print(f"  {stage:<10} {seconds:>9.3f} {share:>6.1%} {calls:>10}",
+                  file=out)
+        print(f"Slowest {top} files:", file=out)
+        slowest = sorted(self.files, key=lambda item: item[0], reverse=True)
+        for seconds, filepath, file_stages in slowest[:top]:
+            print(f"  {seconds:>9.3f}  {filepath}", file=out)
+            split = [f"{stage} {file_stages[stage][0]:.3f}/"
+                     f"{file_stages[stage][1]}"
+                     for stage in stages if stage in file_stages]
+            if split:
+                print(f"  {'':>9}  {', '.join(split)}", file=out)
+        print(f"Most evaluated {top} rules:", file=out)
+        ranked = sorted(total.rules.items(), key=lambda item: -item[1])
+        for rule, count in ranked[:top]:
+            print(f"  {count:>9}  {rule}", file=out)
+
+
+def timer(stats, stage, calls=1):
+    ''' stats.timer(stage), or a no-op context when stats is None '''
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.timer(stage, calls)
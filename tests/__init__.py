@@ -0,0 +1,6 @@
+"""Tests for the Domain Assignment Checker
+
+Checks that the optimized code paths give the same results as the
+reference implementations they replaced. Run with python -m pytest or
+python -m unittest.
+"""
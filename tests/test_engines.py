@@ -0,0 +1,83 @@
+"""The batch engines against the line engine
+
+--engine batch and --engine numpy must give the results of the default
+line engine: the same passes, violations, log and stopped flag, with and
+without per file limits, with -v, and at batch sizes that split the
+file anywhere. The numpy cases are skipped when numpy isn't installed.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import svdac  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+LIMITS = [None, 1, 3, 50]
+BATCH_SIZES = [1, 7, 1024]
+WIDE_RULES = (
+    "// DACrule: s1-63, p1-63 <= s0-62, p0-62, [0-62] -- OKreg\n"
+    "// DACrule: s0-63, p0-63 = s0-63, p0-63 -- OKcomb\n"
+    "// DACexception: srst, time_cnt_\n")
+
+
+def texts():
+    ''' (name, text) of generated files at low and high violation rates,
+    with and without embedded pragmas, and with wide embedded rules '''
+    files = [(f"generated{seed}.sv",
+              svgen.generate(1000, seed=seed, violation_rate=rate,
+                             pragmas=bool(seed % 2)))
+             for seed, rate in enumerate([0.02, 0.02, 0.2, 0.5])]
+    files.append(("wide.sv", WIDE_RULES + svgen.generate(
+        1000, seed=4, violation_rate=0.2, pragmas=False)))
+    return files
+
+
+def outcome(result):
+    return (svdac.result_to_dict(result),
+            [violation.linenum for violation in result.violations])
+
+
+class EngineTest(unittest.TestCase):
+    engine = 'batch'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.texts = texts()
+
+    def assert_agree(self, **options):
+        line = svdac.Checker(**options)
+        for batch_size in BATCH_SIZES:
+            checker = svdac.Checker(engine=self.engine,
+                                    batch_size=batch_size,
+                                    ruleset_cache=64, **options)
+            for name, text in self.texts:
+                with self.subTest(file=name, batch_size=batch_size,
+                                  **options):
+                    self.assertEqual(outcome(checker.check_text(text, name)),
+                                     outcome(line.check_text(text, name)))
+
+    def test_whole_files(self):
+        self.assert_agree()
+
+    def test_per_file_limits(self):
+        for limit in LIMITS[1:]:
+            self.assert_agree(max_per_file=limit)
+
+    def test_verbose(self):
+        self.assert_agree(verbose=True)
+        self.assert_agree(verbose=True, max_per_file=3)
+
+    def test_rules_file(self):
+        rules = svdac.process_raw_rules(
+            ["s1-7 <= s0-6 -- OKreg", "s0-7 = s0-7 -- OKcomb"])
+        self.assert_agree(rules=rules, max_per_file=50)
+
+
+@unittest.skipIf(svdac.load_numpy() is None, "numpy is not installed")
+class NumpyEngineTest(EngineTest):
+    engine = 'numpy'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Single pass preprocessing against the replace-all reference
+
+legacy_preprocess is the preprocessing file_to_lines did before
+strip_code and space_code, one full pass per comment kind, block comment,
+macro and spacing rule. preprocess must give byte-identical output on
+generated code and on snippets where comments, macros and strings
+interact.
+"""
+import os
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import simple_verilog_parser  # noqa: E402
+from benchmarks import svgen  # noqa: E402
+
+# Cases where comment and macro removal interact
+SNIPPETS = [
+    "`ifdef A\n`ifdef AB\nx = y;\n`endif\n`endif // done\n",
+    "`define M(a) \\\n  (a + 1) /* one line */ \\\n  + 2\nassign x = `M(y);\n",
+    "/* a /* b */ x <= y; /* b */\n",
+    "/* a *// b\n */ c = d;\n",
+    "a = b; /* open\n// */ still comment */ e = f;\n",
+    "a = b \\// c\nd = e;\n",
+    "if(a)begin:lbl x<=y;end else if(b)z=w;\n",
+    "pkg::t x; y = a::b::c; z = a :: b;\n",
+    "/* never closed\nx = y;\n",
+    "`define X 1 /* two\nline */ y = z;\n",
+    "a <= b<=c; d == e; f != g; h >= i; j => k;\n",
+    # Nested block comments
+    "/* a /* b /* c */ d = e; */ f <= g;\n",
+    "/* /* */ */ x = y;\n/* x /* */ y = z;\n",
+    # Strings holding comment markers
+    'x = "http://host"; y_s1 <= z_s0;\n',
+    '$display("/* not a comment */"); a = b;\n',
+    '$display("// no"); /* "*/" */ c = d;\n',
+    # Pragmas and macros at the end of the file, without a newline
+    "a_s1 <= b_s0; //noDAC",
+    "a_s1 <= b_s0; //noDAC;",
+    "x = y;\n// DACrule: s1 <= s0 -- OKreg",
+    "x = y;\n/* DACexception: srst */",
+    "x = y;\n`define LAST 1",
+    "x = y; \\",
+    "x = y; /* open at the end",
+]
+
+
+def legacy_preprocess(file_contents):
+    ''' Reference preprocessing, one pass per comment kind, block comment,
+    macro and spacing rule '''
+    # Remove comments to avoid false positives
+    code = re.sub(r'//.*', '', file_contents)
+    # Preserve line number
+    cblocks = re.findall(r'/\*.*?\*/', code, re.DOTALL)
+    for cblock in cblocks:
+        cnt = cblock.count("\n")
+        code = code.replace(cblock, "\n" * cnt)
+    # Remove macros, as they can be anything
+    code = code.replace('\\\n', '__killed_macro__')
+    mblocks = re.findall(r'`.*', code)
+    for mblock in mblocks:
+        mcnt = mblock.count('__killed_macro__')
+        code = code.replace(mblock, "\n" * mcnt)
+    # Ensure spaces around key symbols and words for easy token regex
+    for kw in ['(', ')', ';', ':']:
+        code = code.replace(kw, f' {kw} ')
+    for kw in ['begin', 'end', 'if', 'else', 'case', 'endcase', 'for',
+               'endgenerate', 'endfunction']:
+        # Only match if it's a standalone word
+        code = re.sub(rf'(?<!\w){kw}(?!\w)', f' {kw} ', code)
+    for kw in ['<=', '=']:
+        # Only match if it's a standalone operator
+        code = re.sub(rf'(?<![<=>!]){kw}(?![<=>])', f' {kw} ', code)
+    # fix ::
+    code = code.replace(' :  : ', '::')
+    return code
+
+
+class PreprocessTest(unittest.TestCase):
+    def assert_same(self, code):
+        self.assertEqual(simple_verilog_parser.preprocess(code),
+                         legacy_preprocess(code))
+
+    def test_snippets(self):
+        for snippet in SNIPPETS:
+            with self.subTest(snippet=snippet):
+                self.assert_same(snippet)
+
+    def test_generated(self):
+        for seed in range(4):
+            with self.subTest(seed=seed):
+                self.assert_same(svgen.generate(2000, seed=seed))
+
+    def test_generated_without_trailing_newline(self):
+        self.assert_same(svgen.generate(500, seed=7).rstrip("\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()